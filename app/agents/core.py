@@ -1,16 +1,24 @@
+import asyncio
+from datetime import datetime
+from uuid import uuid4
 from langchain_openai import ChatOpenAI
+from langchain_core.globals import set_llm_cache
+from langchain_community.cache import SQLiteCache
 from langgraph.graph import StateGraph, END
 from langgraph.graph.state import CompiledStateGraph
-from typing import Dict, Any
+from langgraph.checkpoint.memory import MemorySaver
+from typing import Dict, Any, List
 
 from langchain.tools.base import BaseTool
 from app.prompts.core import RESPONSE_SYNTHESIS_PROMPT
 from app.agents.router import ToolRouter
 from app.agents.memory import MemoryManager
+from app.agents.semantic_cache import SemanticResponseCache
 from app.tools.analysis_tools import WebSearchTool, CodeExecutorTool, DocumentSummarizerTool, CalculatorTool
 from app.utils.logging import setup_logger, log_function_call, log_function_result, log_error
-from langchain_core.rate_limiters import InMemoryRateLimiter
-from app.agents.state import AgentState
+from app.utils.rate_limiting import TokenBucketRateLimiter
+from app.utils.models import MODEL_TIERS
+from app.agents.state import AgentState, Subgoal
 from app.agents.task_planner import TaskPlanner
 from app.agents.task_reviewer import TaskReviewer
 from app.evaluator.agent_eval import AgentEvaluator
@@ -18,26 +26,58 @@ from app.evaluator.agent_eval import AgentEvaluator
 # Set up logger for this module
 logger = setup_logger(__name__)
 
-rate_limiter = InMemoryRateLimiter(
-    requests_per_second=10,
-    check_every_n_seconds=2,
-    max_bucket_size=10,
+# Process-wide exact-match completion cache. Every chain here runs at
+# temperature=0, so an identical rendered prompt always yields the same
+# completion; SQLite persistence means repeated routing/planning/sanitizing
+# prompts skip the API across restarts too. Paraphrase-level (semantic)
+# hits are handled a layer up by SemanticResponseCache.
+set_llm_cache(SQLiteCache(database_path=".finagent_cache.db"))
+
+# Shared across all LLM clients so the combined request and token spend
+# stays within provider limits instead of triggering 429 retry storms
+rate_limiter = TokenBucketRateLimiter(
+    requests_per_minute=600,
+    tokens_per_minute=200_000,
 )
 
+# The evaluator owns its background queue and worker thread, so enqueued
+# specs never add LLM-judge latency to the request path
 evaluator = AgentEvaluator()
 
 class FinancialAgent:
     """Main agent orchestrator that manages the workflow."""
     
-    def __init__(self):
+    def __init__(self, session_id: str = "financial_agent"):
+        """Build an agent whose conversational state is private to session_id.
+
+        The chains, chat clients and embeddings behind the collaborators are
+        memoized at module level, so constructing an agent per session is
+        cheap — only the memory, the semantic response cache and the
+        checkpointer are per-instance, which is exactly the state that must
+        not leak between users.
+        """
         self.logger = setup_logger(f"{__name__}.FinancialAgent")
-        self.logger.info("Initialized FinancialAgent")
+        self.logger.info(f"Initialized FinancialAgent for session {session_id}")
         self.task_planner = TaskPlanner(rate_limiter=rate_limiter)
         self.task_reviewer = TaskReviewer(rate_limiter=rate_limiter)
         self.tool_router = ToolRouter(self._initialize_tools())
-        self.memory = MemoryManager(session_id="financial_agent")
-        self.llm = ChatOpenAI(model="gpt-4o", temperature=0, rate_limiter=rate_limiter)
+        self.memory = MemoryManager(session_id=session_id, rate_limiter=rate_limiter)
+        self.response_cache = SemanticResponseCache(self.memory.embeddings)
+        self.llm = ChatOpenAI(model=MODEL_TIERS["synthesizer"], temperature=0, rate_limiter=rate_limiter)
+        # Compose the synthesis chain once instead of re-formatting the
+        # prompt template on every response
+        self._synth_chain = RESPONSE_SYNTHESIS_PROMPT | self.llm
+        # Formatted memory context per (subgoal description, memory version);
+        # entries self-invalidate because the key changes with message_count
+        self._ctx_cache: Dict[tuple, str] = {}
+        # Checkpoint graph state per run so a failed run's last completed
+        # node is preserved for inspection; successful runs delete their
+        # thread, since MemorySaver never evicts on its own
+        self._checkpointer = MemorySaver()
         self.workflow = self._create_workflow()
+        # Same graph without the synthesis node, used by stream_query so the
+        # final response can be streamed token-by-token to the caller
+        self.subgoal_workflow = self._create_workflow(include_synthesis=False)
 
     def should_continue(self, state: AgentState) -> str:
         """Determine if we should continue processing subgoals.
@@ -47,32 +87,34 @@ class FinancialAgent:
         """
         return "synthesize" if state.current_subgoal_index >= len(state.subgoals) else "process_subgoal"
 
-    def _get_memory_context(self, subgoal_desc: str, state: AgentState) -> Dict[str, Any]:
+    def _get_memory_context(self, subgoal_desc: str, memory: MemoryManager) -> Dict[str, Any]:
         """Get and organize relevant memory context for a subgoal.
-        
+
         Args:
             subgoal_desc: The description of the current subgoal
-            state: The current agent state
-            
+            memory: The memory manager to pull context from
+
         Returns:
             Dict containing organized context from memory
         """
-        context = state.memory.get_relevant_context(subgoal_desc)
+        context = memory.get_relevant_context(subgoal_desc)
         memory_context = {
             "conversation_summary": "",
             "recent_context": [],
             "relevant_history": []
         }
-        
+
         if context:
+            # Hash-based membership instead of scanning recent_context per message
+            recent_set = {(msg["role"], msg["content"]) for msg in memory.recent_context}
             for msg in context:
                 if msg["role"] == "system" and "summary" in msg["content"].lower():
                     memory_context["conversation_summary"] = msg["content"]
-                elif msg in state.memory.recent_context:
+                elif (msg["role"], msg["content"]) in recent_set:
                     memory_context["recent_context"].append(msg)
                 else:
                     memory_context["relevant_history"].append(msg)
-        
+
         return memory_context
     
     def _format_memory_context(self, memory_context: Dict[str, Any]) -> str:
@@ -99,101 +141,257 @@ class FinancialAgent:
             ))
         return "\n\n".join(context_parts)
 
-    def _check_dependencies(self, state: AgentState, current_subgoal: Dict[str, Any]) -> Dict[str, Any]:
+    def _check_dependencies(self, state: AgentState, current_subgoal: Subgoal) -> Dict[str, Any]:
         """Check and handle subgoal dependencies.
-        
+
+        Dependencies are resolved through the precomputed order-number index
+        map, so only the declared dependencies are visited instead of
+        scanning every previous subgoal.
+
         Args:
             state: The current agent state
             current_subgoal: The subgoal being processed
-            
+
         Returns:
             Dict: Results from previous dependent subgoals
         """
         prev_results = {}
-        if state.current_subgoal_index > 0:
-            previous_subgoals = state.subgoals[:state.current_subgoal_index]
-            for subgoal in previous_subgoals:
-                if str(subgoal["order_number"]) in current_subgoal.get('depends_on', []):
-                    if not subgoal.get('completed', False):
-                        current_subgoal['skipped'] = True
-                        return prev_results
-                    prev_results[subgoal['description']] = subgoal.get('result', '')
+        for dep in current_subgoal.depends_on:
+            dep_index = state.order_to_index.get(str(dep))
+            if dep_index is None:
+                continue
+            subgoal = state.subgoals[dep_index]
+            if not subgoal.completed:
+                current_subgoal.skipped = True
+                return prev_results
+            prev_results[subgoal.description] = subgoal.result or ''
         return prev_results
 
-    def process_subgoal(self, state: AgentState) -> AgentState:
-        """Process the current subgoal using appropriate tool."""
+    @staticmethod
+    def _build_dag(subgoals: List[Subgoal]) -> List[List[int]]:
+        """Group subgoals into topological layers using Kahn's algorithm.
+
+        Subgoals in the same layer have no dependencies on each other and can
+        be executed concurrently.
+
+        Args:
+            subgoals: The planned subgoals with their depends_on lists
+
+        Returns:
+            List of layers, each a list of indices into subgoals
+        """
+        order_to_idx = {str(sg.order_number): i for i, sg in enumerate(subgoals)}
+        in_degree = [0] * len(subgoals)
+        dependents: List[List[int]] = [[] for _ in subgoals]
+
+        for i, sg in enumerate(subgoals):
+            for dep in sg.depends_on:
+                dep_idx = order_to_idx.get(str(dep))
+                if dep_idx is not None and dep_idx != i:
+                    in_degree[i] += 1
+                    dependents[dep_idx].append(i)
+
+        layers = []
+        current = [i for i, deg in enumerate(in_degree) if deg == 0]
+        while current:
+            layers.append(current)
+            next_layer = []
+            for i in current:
+                for j in dependents[i]:
+                    in_degree[j] -= 1
+                    if in_degree[j] == 0:
+                        next_layer.append(j)
+            current = next_layer
+
+        # Any leftover indices indicate a dependency cycle; give each its
+        # own layer so they run serially in plan order rather than
+        # concurrently despite depending on one another
+        seen = {i for layer in layers for i in layer}
+        for i in range(len(subgoals)):
+            if i not in seen:
+                layers.append([i])
+
+        return layers
+
+    def _layer_for(self, state: AgentState, index: int) -> List[int]:
+        """Return the DAG layer containing the given subgoal index."""
+        for layer in state.layers:
+            if index in layer:
+                return layer
+        return [index]
+
+    def _memory_context_for(self, description: str, memory: MemoryManager) -> str:
+        """Formatted memory context for a subgoal, via the context cache.
+
+        Reuses the formatted string when neither the subgoal nor the memory
+        contents have changed (e.g. retries).
+        """
+        cache_key = (description, memory.message_count)
+        formatted_context = self._ctx_cache.get(cache_key)
+        if formatted_context is None:
+            memory_context = self._get_memory_context(description, memory)
+            formatted_context = self._format_memory_context(memory_context)
+            if len(self._ctx_cache) > 256:
+                self._ctx_cache.clear()
+            self._ctx_cache[cache_key] = formatted_context
+        return formatted_context
+
+    def _routing_prefetch_context(self, description: str) -> str:
+        """Routing input for a dependency-free subgoal, before state exists.
+
+        Must render byte-identically to what _build_subgoal_context later
+        produces for the same subgoal, so the prefetched routing decision
+        is found in the route cache.
+        """
+        formatted_context = self._memory_context_for(description, self.memory)
+        return f"memory_context: {formatted_context}\n\nCurrent Subgoal: {description}"
+
+    def _build_subgoal_context(self, state: AgentState, index: int) -> str | None:
+        """Format memory and dependency context for routing a subgoal.
+
+        Returns None when the subgoal was skipped because a dependency failed.
+        """
+        current_subgoal = state.subgoals[index]
+
+        prev_results = {"memory_context": self._memory_context_for(current_subgoal.description, self.memory)}
+
+        # Check dependencies
+        prev_results.update(self._check_dependencies(state, current_subgoal))
+        if current_subgoal.skipped:
+            return None
+
+        # Add context to query
+        context_str = "\n\n".join(
+            f"{desc}: {result}" for desc, result in prev_results.items()
+        ) if prev_results else ""
+
+        context_str += f"\n\nCurrent Subgoal: {current_subgoal.description}"
+        return context_str
+
+    async def _route_layer(self, state: AgentState, indices: List[int]) -> None:
+        """Route all given subgoals with one batched routing call.
+
+        Stores the selected tool and query on each subgoal so
+        _execute_subgoal can go straight to execution. Runs the batched
+        call through abatch so the routing round-trips overlap on the
+        event loop.
+        """
+        contexts = []
+        routable = []
+        for i in indices:
+            context_str = self._build_subgoal_context(state, i)
+            if context_str is not None:
+                contexts.append(context_str)
+                routable.append(i)
+
+        if not routable:
+            return
+
+        for i, (tool, query, is_url) in zip(routable, await self.tool_router.route_batch_async(contexts)):
+            subgoal = state.subgoals[i]
+            subgoal.tool = tool.name
+            subgoal.query = query
+            subgoal.is_url = is_url
+
+    def _execute_subgoal(self, state: AgentState, index: int) -> None:
+        """Execute a single subgoal in place, routing it to the appropriate tool."""
         try:
-            current_subgoal = state.subgoals[state.current_subgoal_index]
-            self.logger.debug(f"Processing subgoal: {current_subgoal}")
-            
-            # Get memory context
-            memory_context = self._get_memory_context(current_subgoal['description'], state)
-            prev_results = {"memory_context": self._format_memory_context(memory_context)}
-            
-            # Check dependencies
-            prev_results.update(self._check_dependencies(state, current_subgoal))
-            if current_subgoal.get('skipped', False):
-                return state
-            
-            # Add context to query
-            context_str = "\n\n".join(
-                f"{desc}: {result}" for desc, result in prev_results.items()
-            ) if prev_results else ""
+            current_subgoal = state.subgoals[index]
+            self.logger.debug("Processing subgoal: %s", current_subgoal)
 
-            context_str += f"\n\nCurrent Subgoal: {current_subgoal['description']}"
+            if current_subgoal.tool is None:
+                context_str = self._build_subgoal_context(state, index)
+                if context_str is None:
+                    return
 
-            # Route and execute
-            tool, query, is_url = self.tool_router.route(context_str)
-            state.subgoals[state.current_subgoal_index]['tool'] = tool.name
-            state.subgoals[state.current_subgoal_index]['query'] = query
-            
-            result = self.tool_router.execute_tool(tool, current_subgoal['description'], query, is_url)
+                tool, query, is_url = self.tool_router.route(context_str)
+                current_subgoal.tool = tool.name
+                current_subgoal.query = query
+            else:
+                # Already routed by _route_layer as part of a batched call
+                if current_subgoal.skipped:
+                    return
+                tool = self.tool_router.tools[current_subgoal.tool]
+                query = current_subgoal.query
+                is_url = current_subgoal.is_url
 
-            evaluator.evaluate("tool_use", query=current_subgoal['description'], tool=tool.name, output=result.get('result'))
+            result = self.tool_router.execute_tool(tool, current_subgoal.description, query, is_url)
+
+            evaluator.enqueue([
+                {"metric": "tool_use", "query": current_subgoal.description, "tool": tool.name, "output": result.get('result')},
+                {"metric": "task_success", "query": current_subgoal.description, "output": result.get('result')},
+            ])
 
-            evaluator.evaluate('task_success', query=current_subgoal['description'], output=result.get('result'))
-            
             # Update state
-            current_subgoal['completed'] = True
-            current_subgoal['result'] = result
-            state.subgoals[state.current_subgoal_index] = current_subgoal
-            return state
-            
+            current_subgoal.completed = True
+            current_subgoal.result = result
+
         except Exception as e:
             self.logger.error(f"Error processing subgoal: {str(e)}")
-            current_subgoal = state.subgoals[state.current_subgoal_index]
-            current_subgoal['result'] = {"error": str(e)}
-            current_subgoal['completed'] = False
-            state.subgoals[state.current_subgoal_index] = current_subgoal
+            current_subgoal = state.subgoals[index]
+            current_subgoal.result = {"error": str(e)}
+            current_subgoal.completed = False
+
+    async def process_subgoal(self, state: AgentState) -> AgentState:
+        """Process the current subgoal, executing its whole DAG layer concurrently.
+
+        When the current subgoal starts a new dependency layer, all other
+        subgoals in that layer are independent of it, so they are executed
+        in parallel and their results stored. Later iterations of the graph
+        loop find the results already present and skip straight to review.
+        """
+        current_subgoal = state.subgoals[state.current_subgoal_index]
+
+        # Result already produced by an earlier layer execution
+        if current_subgoal.result is not None or current_subgoal.skipped:
             return state
-        
-    def retry_subgoal(self, state: AgentState) -> AgentState:
+
+        layer = self._layer_for(state, state.current_subgoal_index)
+        pending = state.unexecuted(layer)
+
+        if len(pending) > 1:
+            self.logger.info(f"Executing {len(pending)} independent subgoals concurrently")
+            # Route the whole layer in one batched call, then run the tools
+            await self._route_layer(state, pending)
+            await asyncio.gather(
+                *[asyncio.to_thread(self._execute_subgoal, state, i) for i in pending]
+            )
+        else:
+            await asyncio.to_thread(self._execute_subgoal, state, state.current_subgoal_index)
+
+        return state
+
+    async def retry_subgoal(self, state: AgentState) -> AgentState:
         """Retry the current subgoal based on the review feedback."""
-        self.logger.debug(f"Retrying subgoal: {state.subgoals[state.current_subgoal_index]}")
+        self.logger.debug("Retrying subgoal: %s", state.subgoals[state.current_subgoal_index])
         current_subgoal = state.subgoals[state.current_subgoal_index]
-        
+
         # Increment retry count
-        current_subgoal['retries'] += 1
-        
+        current_subgoal.retries += 1
+
         # If max retries reached, mark as failed
-        if current_subgoal['retries'] >= self.task_reviewer.max_retries:
-            current_subgoal['completed'] = False
-            current_subgoal['skipped'] = True
-            self.logger.warning(f"Max retries reached for subgoal: {current_subgoal['description']}")
+        if current_subgoal.retries >= self.task_reviewer.max_retries:
+            current_subgoal.completed = False
+            current_subgoal.skipped = True
+            self.logger.warning(f"Max retries reached for subgoal: {current_subgoal.description}")
             return state
 
-        query = current_subgoal.get('query', current_subgoal['description'])
-        is_url = current_subgoal.get('is_url', False)
-        
-        result = self.tool_router.execute_tool(self.tool_router.tools[current_subgoal["tool"]], current_subgoal['description'], query, is_url)
+        query = current_subgoal.query or current_subgoal.description
+        is_url = current_subgoal.is_url
 
-        evaluator.evaluate("tool_use", query=current_subgoal['description'], tool=current_subgoal["tool"], output=result.get('result'))
+        result = await asyncio.to_thread(
+            self.tool_router.execute_tool,
+            self.tool_router.tools[current_subgoal.tool], current_subgoal.description, query, is_url
+        )
 
-        evaluator.evaluate('task_success', query=current_subgoal['description'], output=result.get('result'))
-        
-        # Update state
-        current_subgoal['result'] = result
-        state.subgoals[state.current_subgoal_index] = current_subgoal
+        evaluator.enqueue([
+            {"metric": "tool_use", "query": current_subgoal.description, "tool": current_subgoal.tool, "output": result.get('result')},
+            {"metric": "task_success", "query": current_subgoal.description, "output": result.get('result')},
+        ])
+
+        # Update state and queue the new result for review
+        current_subgoal.result = result
+        current_subgoal.reviewed = False
         return state
         
     def next_subgoal(self, state: AgentState) -> AgentState:
@@ -202,59 +400,80 @@ class FinancialAgent:
         self.logger.info(f"Moving to next subgoal: {state.current_subgoal_index}/{len(state.subgoals)}")
         return state
     
-    def synthesize_response(self, state: AgentState) -> AgentState:
+    def _collect_synthesis_inputs(self, state: AgentState) -> tuple[List[str], List[str], str]:
+        """Gather text results, visualizations and memory context for synthesis.
+
+        Args:
+            state: The agent state after all subgoals have been processed
+
+        Returns:
+            Tuple of (text_results, visualizations, context_str)
+        """
+        # Collect useful results and information that helps answer the query
+        useful_results = []
+        for subgoal in state.subgoals:
+            if subgoal.completed:
+                result = subgoal.result
+                if result:
+                    if isinstance(result, dict):
+                        useful_results.append({
+                            **result,
+                            "context": subgoal.description
+                        })
+                    else:
+                        useful_results.append({
+                            "info": str(result),
+                            "context": subgoal.description
+                        })
+
+        # Get relevant context from memory that helps answer the query
+        context = self.memory.get_relevant_context(state.query)
+        context_str = ""
+        if context:
+            context_str = "\nRelevant Historical Context:\n" + "\n".join(
+                f"{msg['role']}: {msg['content']}" for msg in context
+            )
+
+        # Process visualizations and text separately, dropping empty entries
+        # and duplicate results (retries that succeed after fixes can leave
+        # identical outputs on several subgoals) so the synthesis prompt
+        # doesn't pay for the same tokens twice
+        visualizations = []
+        text_results = []
+        seen_results = set()
+
+        for result in useful_results:
+            if isinstance(result, dict):
+                if result.get('type') == 'plot' and 'display' in result:
+                    visualizations.append(result['display'])
+                    continue
+                text = f'Context: {result["context"]}\nResult:{str(result["result"])}'
+            else:
+                text = str(result)
+            if text and text not in seen_results:
+                seen_results.add(text)
+                text_results.append(text)
+
+        return text_results, visualizations, context_str
+
+    async def synthesize_response(self, state: AgentState) -> AgentState:
         """Synthesize final response from subgoal results by focusing on answering the user's query."""
         try:
             self.logger.info("Synthesizing final response from subgoals")
-            
-            # Collect useful results and information that helps answer the query
-            useful_results = []
-            for subgoal in state.subgoals:
-                if subgoal.get('completed', False):
-                    result = subgoal.get('result', None)
-                    if result:
-                        if isinstance(result, dict):
-                            useful_results.append({
-                                **result,
-                                "context": subgoal['description']
-                            })
-                        else:
-                            useful_results.append({
-                                "info": str(result),
-                                "context": subgoal['description']
-                            })
-            
-            # Get relevant context from memory that helps answer the query
-            context = state.memory.get_relevant_context(state.query)
-            context_str = ""
-            if context:
-                context_str = "\nRelevant Historical Context:\n" + "\n".join(
-                    f"{msg['role']}: {msg['content']}" for msg in context
-                )
-            
-            self.logger.info(f"Synthesizing response")
-            
-            # Process visualizations and text separately
-            visualizations = []
-            text_results = []
-            
-            for result in useful_results:
-                if isinstance(result, dict):
-                    if result.get('type') == 'plot' and 'display' in result:
-                        visualizations.append(result['display'])
-                    else:
-                        text_results.append(f'Context: {result["context"]}\nResult:{str(result["result"])}')
-                else:
-                    text_results.append(str(result))
-            
+
+            text_results, visualizations, context_str = self._collect_synthesis_inputs(state)
+
             # Generate text response focused on answering the query
-            response_text = self.llm.invoke(RESPONSE_SYNTHESIS_PROMPT.format_messages(
-                query=state.query,
-                context=context_str,
-                results="\n\n".join(text_results)
-            )).content
+            response = await self._synth_chain.ainvoke({
+                "query": state.query,
+                "context": context_str,
+                "results": "\n\n".join(text_results)
+            })
+            response_text = response.content
 
-            evaluator.evaluate("task_success", query=state.task, output=response_text)
+            evaluator.enqueue([
+                {"metric": "task_success", "query": state.task, "output": response_text},
+            ])
             
             # Combine text and visualizations
             final_response = {
@@ -263,39 +482,35 @@ class FinancialAgent:
             }
             
             # Store results in memory
-            state.memory.add_to_memory("assistant", final_response['content'])
-            
-            return AgentState(
-                task=state.task,
-                query=state.query,
-                subgoals=state.subgoals,
-                current_subgoal_index=state.current_subgoal_index,
-                memory=state.memory,
-                final_response=final_response
-            )
-            
+            self.memory.add_to_memory("assistant", final_response['content'])
+
+            # Mutate in place rather than copying the whole state — subgoal
+            # lists can be large and only final_response changes here
+            state.final_response = final_response
+            return state
+
         except Exception as e:
             self.logger.error(f"Error synthesizing response: {str(e)}")
-            return AgentState(
-                task=state.task,
-                query=state.query,
-                subgoals=state.subgoals,
-                current_subgoal_index=state.current_subgoal_index,
-                memory=state.memory,
-                final_response=f"Error synthesizing response: {str(e)}"
-            )
+            state.final_response = f"Error synthesizing response: {str(e)}"
+            return state
+
+    def _create_workflow(self, include_synthesis: bool = True) -> CompiledStateGraph:
+        """Create the agent workflow using langgraph.
 
-    def _create_workflow(self) -> CompiledStateGraph:
-        """Create the agent workflow using langgraph."""
+        Args:
+            include_synthesis: When False, the graph ends after the subgoal
+                loop so the caller can stream the synthesis step itself
+        """
         self.logger.info("Creating workflow")
         workflow = StateGraph(AgentState)
 
         # Add nodes using class methods as handlers
         workflow.add_node("process_subgoal", self.process_subgoal)
-        workflow.add_node("synthesize", self.synthesize_response)
         workflow.add_node("retry_subgoal", self.retry_subgoal)
         workflow.add_node("next_subgoal", self.next_subgoal)
-        workflow.add_node("review_subgoal", self.task_reviewer.review)
+        workflow.add_node("review_subgoal", self.task_reviewer.review_async)
+        if include_synthesis:
+            workflow.add_node("synthesize", self.synthesize_response)
 
         # Add edges with checkpointing
         workflow.add_edge("process_subgoal", "review_subgoal")
@@ -312,15 +527,16 @@ class FinancialAgent:
             "next_subgoal",
             self.should_continue,
             {
-                "synthesize": "synthesize",
+                "synthesize": "synthesize" if include_synthesis else END,
                 "process_subgoal": "process_subgoal"
             }
         )
-        workflow.add_edge("synthesize", END)
-        
+        if include_synthesis:
+            workflow.add_edge("synthesize", END)
+
         workflow.set_entry_point("process_subgoal")
-        
-        return workflow.compile()
+
+        return workflow.compile(checkpointer=self._checkpointer)
 
     def _initialize_tools(self) -> Dict[str, BaseTool]:
         """Initialize all available tools."""
@@ -330,20 +546,35 @@ class FinancialAgent:
             "code_executor": CodeExecutorTool(),
             "document_summarizer": DocumentSummarizerTool(),
         }
-        self.logger.debug(f"Initialized tools: {list(tools.keys())}")
+        self.logger.debug("Initialized tools: %s", list(tools.keys()))
         return tools
 
     def process_query(self, query: str) -> str:
-        """Process a user query through the agent workflow."""
+        """Process a user query through the agent workflow.
+
+        Sync wrapper around process_query_async for callers without an
+        event loop (the Streamlit form handler).
+        """
+        return asyncio.run(self.process_query_async(query))
+
+    async def process_query_async(self, query: str) -> str:
+        """Process a user query through the agent workflow on the event loop."""
         # log_function_call(self.logger, "process_query", query=query)
         try:
             # Input validation
             if not query or not isinstance(query, str):
                 raise ValueError("Query must be a non-empty string")
             
+            # Short-circuit on a semantic cache hit for repeat/paraphrased queries
+            cached_response = self.response_cache.get(query)
+            if cached_response is not None:
+                self.memory.add_to_memory("human", query)
+                self.memory.add_to_memory("assistant", cached_response['content'])
+                return cached_response
+
             # Add user query to memory
             self.memory.add_to_memory("human", query)
-            
+
             # Get relevant context from previous interactions
             context = self.memory.get_relevant_context(query)
             context_str = ""
@@ -352,12 +583,37 @@ class FinancialAgent:
                     f"{msg['role']}: {msg['content']}" for msg in context
                 )
             
-            # Plan subgoals with context
+            # Compute the date once for the whole turn; planner and reviewer
+            # would otherwise re-format it per subgoal
+            curr_date = datetime.now().strftime("%Y-%m-%d")
+
+            # Plan subgoals with context, prefetching routing decisions for
+            # dependency-free subgoals while the rest of the plan is still
+            # decoding; the workflow later finds them in the route cache
+            prefetches: List[asyncio.Task] = []
+
+            async def _prefetch(description: str) -> None:
+                # The context render embeds the description — a blocking
+                # HTTP round-trip — so it runs in a worker thread; doing it
+                # in the callback would stall the planner stream and the
+                # very route_async tasks the prefetch creates
+                routing_context = await asyncio.to_thread(self._routing_prefetch_context, description)
+                await self.tool_router.route_async(routing_context)
+
+            def _prefetch_route(subgoal_dict: dict) -> None:
+                description = (subgoal_dict.get("description") or "").strip()
+                if description:
+                    prefetches.append(asyncio.create_task(_prefetch(description)))
+
             try:
                 # Include context in planning
-                subgoals, explanation = self.task_planner.plan(query=query, context=context_str)
+                subgoals, explanation = await self.task_planner.plan_stream_async(
+                    query=query, context=context_str, curr_date=curr_date, on_subgoal=_prefetch_route
+                )
 
-                evaluator.evaluate('coherence_reasoning', output=f"Subgoals:{subgoals}\n\nReasoning:{explanation}")
+                evaluator.enqueue([
+                    {"metric": "coherence_reasoning", "output": f"Subgoals:{subgoals}\n\nReasoning:{explanation}"},
+                ])
                 
                 if subgoals is None or (isinstance(subgoals, str) and subgoals.strip() in ["", "null"]):
                     error_msg = "I couldn't break down your query into actionable steps. Could you please rephrase it?"
@@ -367,11 +623,12 @@ class FinancialAgent:
                 # If subgoals is an empty list, then attempt to answer the query using the existing context.
                 if isinstance(subgoals, list) and not subgoals:
                     self.logger.warning("No subgoals generated, attempting to answer query directly")
-                    response = self.llm.invoke(RESPONSE_SYNTHESIS_PROMPT.format_messages(
-                        query=query,
-                        context=context_str,
-                        results=[]
-                    )).content
+                    response = await self._synth_chain.ainvoke({
+                        "query": query,
+                        "context": context_str,
+                        "results": ""
+                    })
+                    response = response.content
                     
                     # Add response to memory
                     self.memory.add_to_memory("assistant", response)
@@ -390,12 +647,28 @@ class FinancialAgent:
                 query=f"Context:{context_str}\n\nQuery:{query}",
                 subgoals=subgoals,
                 current_subgoal_index=0,
-                memory=self.memory
+                layers=self._build_dag(subgoals),
+                order_to_index={str(sg.order_number): i for i, sg in enumerate(subgoals)},
+                curr_date=curr_date
             )
-            
-            # Execute the workflow
+
+            # Let any in-flight routing prefetches land in the cache; they
+            # had the planner's decode tail to run, so this rarely waits
+            if prefetches:
+                await asyncio.gather(*prefetches, return_exceptions=True)
+
+            # Execute the workflow under a per-run thread id; MemorySaver
+            # never evicts, so reusing one id would grow full-state
+            # checkpoints for the life of the process
             try:
-                final_state = self.workflow.invoke(initial_state, {"recursion_limit": 100})
+                thread_id = f"{self.memory.session_id}-{uuid4().hex}"
+                final_state = await self.workflow.ainvoke(initial_state, {
+                    "configurable": {"thread_id": thread_id},
+                    "recursion_limit": 100
+                })
+                # The run completed, so its checkpoints have served their
+                # purpose; failed runs keep theirs for inspection
+                self._checkpointer.delete_thread(thread_id)
                 response = final_state["final_response"]
                   # Check if response is empty or error message
                 if not response or (isinstance(response, dict) and "error" in str(response.get('content', '')).lower()):
@@ -420,7 +693,10 @@ class FinancialAgent:
                 
                 # Add response to memory
                 self.memory.add_to_memory("assistant", response['content'])
-                
+
+                # Cache the successful response for future semantically similar queries
+                self.response_cache.put(query, response)
+
                 # log_function_result(self.logger, "process_query", response)
                 return response
                 
@@ -435,3 +711,120 @@ class FinancialAgent:
             error_msg = f"An unexpected error occurred: {str(e)}. Please try again or contact support if the issue persists."
             # self.memory.add_to_memory("assistant", error_msg)
             return error_msg
+
+    def stream_query(self, query: str, viz_sink: List[str] | None = None):
+        """Process a query and stream the synthesized response token-by-token.
+
+        Planning and subgoal execution run as in process_query, but the final
+        synthesis call uses llm streaming so the caller sees the first tokens
+        after first-token latency instead of waiting for the full completion.
+        The complete text is still accumulated for memory and the semantic
+        response cache.
+
+        Visualizations are HTML blocks, not prose — streamed through a
+        markdown renderer they show up as escaped base64 text — so they are
+        appended to viz_sink for the caller to render with its HTML-capable
+        path once the stream ends.
+
+        Args:
+            query: The user query
+            viz_sink: Optional list that collects visualization markdown
+                blocks produced by the subgoals
+
+        Yields:
+            str: Chunks of the synthesized response text
+        """
+        try:
+            # Input validation
+            if not query or not isinstance(query, str):
+                raise ValueError("Query must be a non-empty string")
+
+            # Short-circuit on a semantic cache hit
+            cached_response = self.response_cache.get(query)
+            if cached_response is not None:
+                self.memory.add_to_memory("human", query)
+                self.memory.add_to_memory("assistant", cached_response['content'])
+                yield cached_response['content']
+                if cached_response.get('display') and viz_sink is not None:
+                    viz_sink.append(cached_response['display'])
+                return
+
+            self.memory.add_to_memory("human", query)
+
+            context = self.memory.get_relevant_context(query)
+            context_str = ""
+            if context:
+                context_str = "\n\nPrevious relevant context:\n" + "\n".join(
+                    f"{msg['role']}: {msg['content']}" for msg in context
+                )
+
+            curr_date = datetime.now().strftime("%Y-%m-%d")
+
+            subgoals, explanation = self.task_planner.plan(query=query, context=context_str, curr_date=curr_date)
+
+            evaluator.enqueue([
+                {"metric": "coherence_reasoning", "output": f"Subgoals:{subgoals}\n\nReasoning:{explanation}"},
+            ])
+
+            if subgoals is None or (isinstance(subgoals, str) and subgoals.strip() in ["", "null"]):
+                yield "I couldn't break down your query into actionable steps. Could you please rephrase it?"
+                return
+
+            visualizations = []
+            if isinstance(subgoals, list) and not subgoals:
+                # Context alone is sufficient — stream the direct answer
+                self.logger.warning("No subgoals generated, streaming direct answer")
+                synth_inputs = {"query": query, "context": context_str, "results": ""}
+            else:
+                initial_state = AgentState(
+                    task=query,
+                    query=f"Context:{context_str}\n\nQuery:{query}",
+                    subgoals=subgoals,
+                    current_subgoal_index=0,
+                    layers=self._build_dag(subgoals),
+                    order_to_index={str(sg.order_number): i for i, sg in enumerate(subgoals)},
+                    curr_date=curr_date
+                )
+
+                # Per-run thread id, released on completion, for the same
+                # reason as in process_query_async: MemorySaver never evicts
+                thread_id = f"{self.memory.session_id}-stream-{uuid4().hex}"
+                final_state = asyncio.run(
+                    self.subgoal_workflow.ainvoke(initial_state, {
+                        "configurable": {"thread_id": thread_id},
+                        "recursion_limit": 100
+                    })
+                )
+                self._checkpointer.delete_thread(thread_id)
+                state = AgentState(**final_state)
+
+                text_results, visualizations, hist_context = self._collect_synthesis_inputs(state)
+                synth_inputs = {
+                    "query": state.query,
+                    "context": hist_context,
+                    "results": "\n\n".join(text_results)
+                }
+
+            response_text = ""
+            for chunk in self._synth_chain.stream(synth_inputs):
+                if chunk.content:
+                    response_text += chunk.content
+                    yield chunk.content
+
+            if viz_sink is not None:
+                viz_sink.extend(visualizations)
+
+            evaluator.enqueue([
+                {"metric": "task_success", "query": query, "output": response_text},
+            ])
+
+            # Store results for future turns and semantically similar queries
+            self.memory.add_to_memory("assistant", response_text)
+            self.response_cache.put(query, {
+                'content': response_text,
+                'display': '\n\n'.join(visualizations) if visualizations else None
+            })
+
+        except Exception as e:
+            log_error(self.logger, e, "streaming query")
+            yield f"An unexpected error occurred: {str(e)}. Please try again or contact support if the issue persists."
@@ -1,114 +1,246 @@
 from typing import List, Dict, Any
+import atexit
+import os
+from functools import lru_cache
+
+import faiss
 from langchain.memory import ConversationBufferMemory
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain.embeddings import CacheBackedEmbeddings
+from langchain.storage import LocalFileStore
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain.schema import AIMessage, HumanMessage
 from langchain_community.vectorstores import FAISS
 from app.utils.logging import setup_logger
+from app.utils.rate_limiting import estimate_tokens
+
+EMBEDDING_CACHE_DIR = "./.emb_cache"
+
+
+@lru_cache(maxsize=None)
+def _shared_summarizer(rate_limiter=None):
+    """Build the summarization model once per rate limiter and share it.
+
+    Memory managers are created per session; sharing the client keeps its
+    connection pool (and the rate limiter budget) common across sessions.
+    """
+    return ChatOpenAI(
+        model="gpt-3.5-turbo-16k",
+        temperature=0,
+        rate_limiter=rate_limiter
+    )
+
+
+@lru_cache(maxsize=1)
+def _shared_embeddings():
+    """Build the disk-cached embedding stack once and share it.
+
+    The embedding cache is content-addressed, so it is safe to share
+    across sessions — only the vector stores built from it are private.
+    """
+    return CacheBackedEmbeddings.from_bytes_store(
+        OpenAIEmbeddings(),
+        LocalFileStore(EMBEDDING_CACHE_DIR),
+        namespace="text-embedding-ada-002",
+        query_embedding_cache=True
+    )
+
 
 class MemoryManager:
     """Manages conversation memory for the agent system."""
     
-    def __init__(self, session_id: str):
+    def __init__(self, session_id: str, rate_limiter=None):
         self.logger = setup_logger(f"{__name__}.MemoryManager")
         self.session_id = session_id
-        
+
         # Initialize in-memory conversation buffer
         self.conversation_memory = ConversationBufferMemory(
             memory_key="chat_history",
             return_messages=True,
             output_key="output"
         )
-        
-        # Initialize message summarizer
-        self.summarizer = ChatOpenAI(
-            model="gpt-3.5-turbo-16k",
-            temperature=0
-        )
-        
-        # Initialize vector store for semantic search
-        self.embeddings = OpenAIEmbeddings()
+
+        # Initialize message summarizer, sharing the agent's rate limiter so
+        # summarization calls draw from the same request/token budget
+        self.summarizer = _shared_summarizer(rate_limiter)
+
+        # Initialize vector store for semantic search, caching embeddings on
+        # disk so identical strings are never re-embedded via the API
+        self.embeddings = _shared_embeddings()
         self.vector_store = None
         self.message_count = 0  # Track number of messages for indexing
+
+        # Persist the index per session so restarts load it from disk
+        # instead of re-embedding the whole history
+        self._persist_dir = f"./vs_{session_id}"
+        self._adds_since_save = 0
+        self._save_every = 10
+        atexit.register(self._save_vector_store)
+
+        # Buffer messages and flush to the vector store in batches so each
+        # message doesn't pay a full embedding round-trip
+        self._pending_texts = []
+        self._pending_meta = []
+        self._flush_batch_size = 16
         
         self.recent_context = []  # Store recent interactions
         self.max_recent_interactions = 5  # Keep last 5 interactions
+        self.max_buffer_messages = 50  # Cap on the raw conversation buffer
         self.summary = ""  # Store running summary of conversation
+        self.max_summary_tokens = 512  # Keep the running summary bounded
         
         self.logger.info("Initialized MemoryManager with semantic search capability")
         
-    def _initialize_vector_store(self):
-        """Initialize the vector store with existing messages."""
+    def _new_vector_store(self) -> FAISS:
+        """Create an empty FAISS store backed by an HNSW index.
+
+        The default flat index scans every vector per search (O(N)); HNSW
+        gives approximate nearest-neighbour lookups in O(log N), which keeps
+        get_relevant_context fast as the conversation grows.
+        """
+        dimension = len(self.embeddings.embed_query("dimension probe"))
+        index = faiss.IndexHNSWFlat(dimension, 32)
+        index.hnsw.efConstruction = 200
+        index.hnsw.efSearch = 64
+        return FAISS(
+            embedding_function=self.embeddings,
+            index=index,
+            docstore=InMemoryDocstore({}),
+            index_to_docstore_id={}
+        )
+
+    def _save_vector_store(self):
+        """Persist the vector store to disk for fast reload on restart."""
         try:
-            messages = self.get_chat_history()
-            if not messages:
-                # Create empty vector store if no messages
-                self.vector_store = FAISS.from_texts(
-                    ["initial_empty_text"], 
+            if self.vector_store is not None:
+                self.vector_store.save_local(self._persist_dir)
+                self._adds_since_save = 0
+        except Exception as e:
+            self.logger.error(f"Error saving vector store: {str(e)}")
+
+    def _initialize_vector_store(self) -> bool:
+        """Initialize the vector store with existing messages.
+
+        A previously persisted index is loaded from disk when available —
+        an O(1) file read instead of re-embedding the entire history.
+        Otherwise initialization is deferred until the first real message
+        arrives so an empty session never pays the index construction or
+        dimension-probe embedding.
+
+        Returns:
+            True when a persisted index was loaded. The loaded index only
+            covers messages from before the restart, so the caller must
+            still queue the message that triggered initialization. The
+            rebuild path indexes the full chat history (which already
+            includes that message) and returns False.
+        """
+        try:
+            if os.path.isdir(self._persist_dir):
+                self.vector_store = FAISS.load_local(
+                    self._persist_dir,
                     self.embeddings,
+                    allow_dangerous_deserialization=True  # our own local files
                 )
-                return
-            
+                self.message_count = self.vector_store.index.ntotal
+                self.logger.info(f"Loaded persisted vector store with {self.message_count} messages")
+                return True
+
+            messages = self.get_chat_history()
+            if not messages:
+                self.vector_store = None
+                return False
+
+            self.vector_store = self._new_vector_store()
+
             # Create text chunks from messages
             texts = [f"{msg['role']}: {msg['content']}" for msg in messages]
             metadatas = [{"role": msg["role"]} for msg in messages]
-            
-            # Initialize vector store
-            self.vector_store = FAISS.from_texts(
-                texts,
-                self.embeddings,
-                metadatas=metadatas
-            )
+
+            self.vector_store.add_texts(texts, metadatas=metadatas)
             self.message_count = len(messages)
             # self.logger.debug(f"Initialized vector store with {self.message_count} messages")
-            
+
         except Exception as e:
             self.logger.error(f"Error initializing vector store: {str(e)}")
-            
+        return False
+
     def _update_vector_store(self, role: str, content: str):
-        """Update vector store with a new message."""
+        """Queue a new message for the vector store, flushing in batches."""
         try:
             if self.vector_store is None:
-                self._initialize_vector_store()
+                # A loaded persisted index predates this message, so fall
+                # through and queue it; the rebuild path already indexed it.
+                if not self._initialize_vector_store():
+                    return
+
+            # Buffer the new message and flush once the batch is full
+            self._pending_texts.append(f"{role}: {content}")
+            self._pending_meta.append({"role": role})
+
+            if len(self._pending_texts) >= self._flush_batch_size:
+                self._flush_pending()
+
+        except Exception as e:
+            self.logger.error(f"Error updating vector store: {str(e)}")
+
+    def _flush_pending(self):
+        """Flush buffered messages to the vector store in a single batch."""
+        try:
+            if not self._pending_texts or self.vector_store is None:
                 return
-            
-            # Add only the new message
-            text = f"{role}: {content}"
-            metadata = {"role": role}
-            
+
             self.vector_store.add_texts(
-                [text],
-                metadatas=[metadata]
+                self._pending_texts,
+                metadatas=self._pending_meta
             )
-            self.message_count += 1
-            # self.logger.debug("Added new message to vector store")
-            
+            self.message_count += len(self._pending_texts)
+            self._adds_since_save += len(self._pending_texts)
+            self._pending_texts = []
+            self._pending_meta = []
+
+            # Periodically checkpoint to disk; atexit covers the remainder
+            if self._adds_since_save >= self._save_every:
+                self._save_vector_store()
+            # self.logger.debug("Flushed pending messages to vector store")
+
         except Exception as e:
-            self.logger.error(f"Error updating vector store: {str(e)}")
+            self.logger.error(f"Error flushing pending messages to vector store: {str(e)}")
             
-    def _summarize_context(self) -> str:
-        """Create or update the running summary of the conversation."""
+    def _summarize_context(self, evicted_message: Dict[str, str]) -> str:
+        """Fold an evicted message into the bounded running summary.
+
+        Only the prior summary plus the newly evicted message are sent to
+        the summarizer, so the per-eviction cost stays constant instead of
+        growing with conversation history. The summary itself is capped at
+        max_summary_tokens and recompressed when it overflows.
+        """
         try:
-            if not self.recent_context:
-                return ""
-                
+            if not evicted_message:
+                return self.summary
+
             # If we already have a summary, include it for context
             prompt = "Summarize the following conversation"
             if self.summary:
-                prompt += ", incorporating this previous summary:\n" + self.summary + "\n\nNew messages:"
-            
-            # Add recent messages to summarize
-            conversation = "\n".join(
-                f"{msg['role']}: {msg['content']}" 
-                for msg in self.recent_context
-            )
-            
+                prompt += ", incorporating this previous summary:\n" + self.summary + "\n\nNew message:"
+
+            conversation = f"{evicted_message['role']}: {evicted_message['content']}"
+
             response = self.summarizer.invoke(
                 prompt + "\n" + conversation + "\n\nProvide a concise summary that preserves key information and context."
             )
-            
-            self.summary = response.content
+            summary = response.content
+
+            # Recompress if the summary has grown past its token budget
+            if estimate_tokens(summary) > self.max_summary_tokens:
+                response = self.summarizer.invoke(
+                    f"Compress the following summary to at most {self.max_summary_tokens} tokens, "
+                    f"preserving key facts, figures and context:\n{summary}"
+                )
+                summary = response.content
+
+            self.summary = summary
             return self.summary
-            
+
         except Exception as e:
             self.logger.error(f"Error summarizing context: {str(e)}")
             return self.summary  # Return existing summary on error
@@ -124,13 +256,20 @@ class MemoryManager:
         # Update recent context
         self.recent_context.append({"role": role, "content": content})
         if len(self.recent_context) > self.max_recent_interactions:
-            # Summarize and update context before removing old messages
-            self._summarize_context()
-            self.recent_context.pop(0)  # Remove oldest interaction
+            # Fold the evicted message into the running summary
+            evicted_message = self.recent_context.pop(0)
+            self._summarize_context(evicted_message)
         
         # Update vector store for semantic search
         self._update_vector_store(role, content)
-        
+
+        # The vector store keeps the full semantic index, so the raw buffer
+        # only needs to hold a short-term working set; trim it so
+        # get_chat_history stays O(max_buffer_messages) over long sessions
+        buffer = self.conversation_memory.chat_memory.messages
+        if len(buffer) > self.max_buffer_messages:
+            self.conversation_memory.chat_memory.messages = buffer[-self.max_buffer_messages:]
+
         # self.logger.debug(f"Added {role} message to memory and updated indexes")
 
     def get_chat_history(self) -> List[Dict[str, str]]:
@@ -144,8 +283,11 @@ class MemoryManager:
     def get_relevant_context(self, query: str) -> List[Dict[str, str]]:
         """Retrieve relevant context using semantic search."""
         try:
+            # Flush any buffered messages so the search sees fresh data
+            self._flush_pending()
+
             relevant_messages = []
-            
+
             # Always include running summary if available
             if self.summary:
                 relevant_messages.append({
@@ -155,22 +297,24 @@ class MemoryManager:
             
             # Include recent context
             relevant_messages.extend(self.recent_context)
-            
+
+            # Track seen messages for O(1) dedup instead of scanning the list
+            seen = {(msg["role"], msg["content"]) for msg in relevant_messages}
+
             # Perform semantic search if vector store exists
             if self.vector_store is not None:
                 search_results = self.vector_store.similarity_search(
                     query,
                     k=3  # Get top 3 most relevant messages
                 )
-                
+
                 # Add semantically relevant messages
                 for doc in search_results:
-                    message = {
-                        "role": doc.metadata["role"],
-                        "content": doc.page_content.split(": ", 1)[1]  # Remove role prefix
-                    }
-                    if message not in relevant_messages:
-                        relevant_messages.append(message)
+                    content = doc.page_content.split(": ", 1)[1]  # Remove role prefix
+                    key = (doc.metadata["role"], content)
+                    if key not in seen:
+                        seen.add(key)
+                        relevant_messages.append({"role": key[0], "content": content})
             
             # self.logger.debug(f"Found {len(relevant_messages)} relevant messages for context")
             return relevant_messages
@@ -1,68 +1,344 @@
+import asyncio
+import re
+import numpy as np
+from collections import OrderedDict
 from typing import Dict, Any
 from langchain.tools.base import BaseTool
-from langchain_openai import ChatOpenAI
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from app.prompts._tools_catalog import TOOL_CATALOG_BLOCK
 from app.utils.logging import setup_logger, log_function_call, log_function_result, log_error
 from app.prompts.tool_router import TOOL_ROUTING_PROMPT
-from pydantic import BaseModel, Field, AliasChoices
+from app.prompts._canonical import canonical
+from app.utils.models import MODEL_TIERS
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+from functools import lru_cache
 
 # Set up logger for this module
 logger = setup_logger(__name__)
 
 
+_KEY_SYNONYMS = {"tool": "selected_tool", "tool_name": "selected_tool", "toolname": "selected_tool", "input": "query"}
+
+def _canonical_keys(data: dict) -> dict:
+    """Normalize LLM-emitted keys (markdown bold, casing, synonyms) once.
+
+    Replaces the per-field AliasChoices lists, which widened the generated
+    validator for every parse.
+    """
+    return {
+        _KEY_SYNONYMS.get(clean, clean): v
+        for k, v in data.items()
+        for clean in (k.strip("*").strip().lower(),)
+    }
+
 class ToolRouterSchema(BaseModel):
     """Schema for tool routing decisions. Always use this to structure tool routing responses."""
-    selected_tool: str = Field(description="The name of the tool selected for the subgoal from the list ['web_search', 'calculator', 'code_executor', 'document_summarizer'].", validation_alias=AliasChoices("tool", "Tool", "**tool**", "**Tool**", "tool_name", "ToolName"))
-    query: str = Field(description="The improved input that is to be passed to the selected tool. This should be a well-formed query or command that the tool can process. Refer to the previous input to the tool to understand the format.", validation_alias=AliasChoices("input", "Input", "**input**", "**Input**"))
+    model_config = ConfigDict(extra='ignore', validate_assignment=False, populate_by_name=True)
+
+    selected_tool: str = Field(description="The name of the tool selected for the subgoal from the list ['web_search', 'calculator', 'code_executor', 'document_summarizer'].")
+    query: str = Field(description="The improved input that is to be passed to the selected tool. This should be a well-formed query or command that the tool can process. Refer to the previous input to the tool to understand the format.")
     is_url: bool = Field(description="Indicator flagging if the query is a URL, allowing the document_summarizer tool to either get data from the URL or summarize the text directly.")
 
+    @model_validator(mode="before")
+    @classmethod
+    def _normalize_keys(cls, data):
+        if isinstance(data, dict):
+            data = _canonical_keys(data)
+        return data
+
+@lru_cache(maxsize=None)
+def _build_chain():
+    """Build the routing chain once; it has no per-instance state.
+
+    Schema derivation and HTTP client setup then happen a single time per
+    process rather than per ToolRouter (one per Streamlit session).
+    Routing only picks one of four tool names and rewrites the query, so
+    gpt-4o-mini is sufficient and markedly cheaper and faster than gpt-4o.
+    """
+    llm = ChatOpenAI(model=MODEL_TIERS["router"], temperature=0).with_structured_output(ToolRouterSchema)
+    return TOOL_ROUTING_PROMPT | llm
+
+# Patterns for routing decisions that don't need an LLM at all
+_URL_RE = re.compile(r"https?://\S+")
+_ARITHMETIC_RE = re.compile(r"[\d\s+\-*/().%]+")
+# Trigger phrases lifted from the routing prompt's own web_search keyword
+# list. web_search is the only tool whose input is the subgoal text itself,
+# so a keyword hit can skip the LLM without losing the query rewrite the
+# other tools rely on.
+_WEB_SEARCH_KW_RE = re.compile(
+    r"\b(latest news|breaking news|current trends|recent regulations|economic indicators|find (?:the |a )?url)\b",
+    re.IGNORECASE,
+)
+
+# Minimum cosine-similarity margin between the best and second-best tool
+# description before the embedding fallback is trusted; below it the call
+# degrades to the LLM router. Conservative because OpenAI embedding
+# similarities cluster tightly.
+_EMBED_ROUTE_MARGIN = 0.02
+
+@lru_cache(maxsize=1)
+def _embedder():
+    return OpenAIEmbeddings(model="text-embedding-3-small")
+
+@lru_cache(maxsize=1)
+def _tool_profile_matrix():
+    """Embed the catalog's tool descriptions once, L2-normalized."""
+    names = []
+    descriptions = []
+    for entry in re.split(r"(?:^|\n)\s*\d\) ", TOOL_CATALOG_BLOCK):
+        if not entry.strip():
+            continue
+        name, _, description = entry.partition(":")
+        names.append(name.strip())
+        descriptions.append(description.strip())
+    matrix = np.array(_embedder().embed_documents(descriptions))
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    return names, matrix
+
 class ToolRouter:
     """Routes subgoals to appropriate tools based on the task requirements."""
-    
+
     def __init__(self, tools: Dict[str, BaseTool]):
         self.tools = tools
-        self.llm = ChatOpenAI(model="gpt-4o", temperature=0).with_structured_output(ToolRouterSchema)
-        self.chain = TOOL_ROUTING_PROMPT | self.llm
+        # The tool set is fixed after construction, so materialize the name
+        # list once instead of rebuilding it on every routing call
+        self._tool_names = list(tools.keys())
+        # Render the tool list once, sorted and canonically serialized, so
+        # the routing prompt's bytes never vary with dict ordering — a
+        # prerequisite for provider-side prefix caching to hit
+        self._tools_repr = canonical(sorted(self._tool_names))
+        self.chain = _build_chain()
+        # Memoize resolved routing decisions: temperature=0 makes the chain
+        # deterministic, so identical routing inputs (plan retries,
+        # Streamlit reruns) can skip the network round-trip entirely
+        self._route_cache: OrderedDict[str, tuple[BaseTool, str, bool]] = OrderedDict()
+        self._route_cache_size = 1024
         self.logger = setup_logger(f"{__name__}.ToolRouter")
-        self.logger.info(f"Initialized ToolRouter with tools: {list(tools.keys())}")
+        self.logger.info("Initialized ToolRouter with tools: %s", self._tool_names)
+
+    def _resolve_response(self, response, subgoal: str) -> tuple[BaseTool, str, bool]:
+        """Turn a routing chain response into (tool, query, is_url)."""
+        if not response:
+            self.logger.warning("No response received from tool routing chain, defaulting to web_search")
+            return self.tools["web_search"], subgoal, False
+
+        # with_structured_output already returns a validated ToolRouterSchema;
+        # re-validating it was pure overhead. If a raw dict slips through,
+        # model_construct is safe because json_schema mode enforced the types
+        # upstream.
+        if not isinstance(response, ToolRouterSchema):
+            response = ToolRouterSchema.model_construct(**_canonical_keys(response))
+
+        self.logger.debug("LLM tool selection response: %s", response)
+
+        # Extract tool name from response
+        selected_tool_name = response.selected_tool.lower()
+        query = response.query
+        is_url = response.is_url
+
+        if not selected_tool_name:
+            self.logger.warning("Selected tool %r not found, defaulting to web_search", selected_tool_name)
+            return self.tools["web_search"], subgoal, False
+
+        # log_function_result(self.logger, "route", f"Selected tool: {selected_tool_name}, query: {query}")
+        return self.tools.get(selected_tool_name), query, is_url
+
+    @staticmethod
+    def _subgoal_text(subgoal: str) -> str:
+        # Routing input embeds dependency context; heuristics only apply to
+        # the subgoal text itself
+        return subgoal.rsplit("Current Subgoal:", 1)[-1].strip()
+
+    def _fast_route(self, subgoal: str) -> tuple[BaseTool, str, bool] | None:
+        """Route unambiguous subgoals without an LLM call.
+
+        URLs, bare arithmetic expressions, explicit Python code and clear
+        web-search trigger phrases all map to exactly one tool, so routing
+        them costs zero tokens. Returns None when the decision genuinely
+        needs the LLM.
+        """
+        text = self._subgoal_text(subgoal)
+
+        url = _URL_RE.search(text)
+        if url:
+            return self.tools["document_summarizer"], url.group(0), True
+        if _ARITHMETIC_RE.fullmatch(text) and any(ch.isdigit() for ch in text):
+            return self.tools["calculator"], text, False
+        if "```python" in text or "def " in text:
+            return self.tools["code_executor"], text, False
+        if _WEB_SEARCH_KW_RE.search(text):
+            return self.tools["web_search"], text, False
+        return None
+
+    def _embedding_route_batch(self, subgoals: list[str]) -> list[tuple[BaseTool, str, bool] | None]:
+        """Classify subgoals against the tool descriptions by embedding.
+
+        One embedding call replaces the LLM router for subgoals whose
+        nearest tool description is web_search by a clear margin; the
+        other tools still need the LLM's query rewrite, so anything else
+        returns None and falls through. Embedding failures also degrade
+        to the LLM path rather than erroring the subgoal.
+        """
+        try:
+            names, matrix = _tool_profile_matrix()
+            texts = [self._subgoal_text(s) for s in subgoals]
+            vectors = np.array(_embedder().embed_documents(texts))
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            similarities = vectors @ matrix.T
+        except Exception as e:
+            self.logger.debug("Embedding route unavailable: %s", e)
+            return [None] * len(subgoals)
+
+        results = []
+        for text, sims in zip(texts, similarities):
+            order = np.argsort(sims)[::-1]
+            if names[order[0]] == "web_search" and sims[order[0]] - sims[order[1]] >= _EMBED_ROUTE_MARGIN:
+                results.append((self.tools["web_search"], text, False))
+            else:
+                results.append(None)
+        return results
+
+    def _embedding_route(self, subgoal: str) -> tuple[BaseTool, str, bool] | None:
+        return self._embedding_route_batch([subgoal])[0]
+
+    def _apply_embedding_routes(self, subgoals: list[str], results: list, indices: list[int]) -> list[int]:
+        """Fill results for embedding-routable indices; return the rest."""
+        remaining = []
+        for i, routed in zip(indices, self._embedding_route_batch([subgoals[i] for i in indices])):
+            if routed is not None:
+                results[i] = routed
+                self._cache_put(subgoals[i], routed)
+            else:
+                remaining.append(i)
+        return remaining
+
+    def _cache_get(self, subgoal: str) -> tuple[BaseTool, str, bool] | None:
+        cached = self._route_cache.get(subgoal)
+        if cached is not None:
+            self._route_cache.move_to_end(subgoal)
+        return cached
+
+    def _cache_put(self, subgoal: str, result: tuple[BaseTool, str, bool]) -> None:
+        self._route_cache[subgoal] = result
+        if len(self._route_cache) > self._route_cache_size:
+            self._route_cache.popitem(last=False)
 
     def route(self, subgoal: str) -> tuple[BaseTool, str, str]:
         """Select the most appropriate tool for a given subgoal."""
         # log_function_call(self.logger, "route", subgoal=subgoal)
         try:
-            tool_names = list(self.tools.keys())
-            # self.logger.debug(f"Available tools: {tool_names}")
-            
-            response = self.chain.invoke({"subgoal": subgoal, "tools": tool_names})
+            fast = self._fast_route(subgoal)
+            if fast is not None:
+                self.logger.debug("Fast-routed subgoal to %s", fast[0].name)
+                return fast
+
+            cached = self._cache_get(subgoal)
+            if cached is not None:
+                return cached
+
+            routed = self._embedding_route(subgoal)
+            if routed is not None:
+                self._cache_put(subgoal, routed)
+                return routed
+
+            response = self.chain.invoke({"subgoal": subgoal, "tools": self._tools_repr})
 
             # self.logger.debug(f"Tool route response: {response}")
 
-            if not response:
-                self.logger.warning("No response received from tool routing chain, defaulting to web_search")
-                selected_tool_name = "web_search"
-                query = subgoal
+            result = self._resolve_response(response, subgoal)
+            self._cache_put(subgoal, result)
+            return result
+        except Exception as e:
+            log_error(self.logger, e, "routing subgoal to tool")
+            raise
 
-            response = ToolRouterSchema.model_validate(response)
+    async def route_async(self, subgoal: str) -> tuple[BaseTool, str, bool]:
+        """Async counterpart of route for event-loop callers."""
+        try:
+            fast = self._fast_route(subgoal) or self._cache_get(subgoal)
+            if fast is not None:
+                return fast
 
-            self.logger.debug(f"LLM tool selection response: {response}")
-            
-            # Extract tool name from response
-            selected_tool_name = response.selected_tool.lower()
-            query = response.query
-            is_url = response.is_url
-
-            if not selected_tool_name:
-                self.logger.warning(f"Selected tool '{selected_tool_name}' not found, defaulting to web_search")
-                selected_tool_name = self.tools["web_search"]
-                query = subgoal
-                is_url = False
-            
-            # log_function_result(self.logger, "route", f"Selected tool: {selected_tool_name}, query: {query}")
-            selected_tool = self.tools.get(selected_tool_name)
-            return selected_tool, query, is_url
+            routed = await asyncio.to_thread(self._embedding_route, subgoal)
+            if routed is not None:
+                self._cache_put(subgoal, routed)
+                return routed
+
+            response = await self.chain.ainvoke({"subgoal": subgoal, "tools": self._tools_repr})
+
+            result = self._resolve_response(response, subgoal)
+            self._cache_put(subgoal, result)
+            return result
         except Exception as e:
             log_error(self.logger, e, "routing subgoal to tool")
             raise
 
+    def route_batch(self, subgoals: list[str]) -> list[tuple[BaseTool, str, bool]]:
+        """Route several independent subgoals with one batched chain call.
+
+        Batching amortizes per-request connection and queueing latency, so
+        routing a whole DAG layer costs roughly one round-trip instead of
+        one per subgoal. Subgoals the heuristics can settle skip the LLM
+        entirely.
+        """
+        try:
+            results: list = [None] * len(subgoals)
+            llm_indices = []
+            for i, subgoal in enumerate(subgoals):
+                fast = self._fast_route(subgoal) or self._cache_get(subgoal)
+                if fast is not None:
+                    results[i] = fast
+                else:
+                    llm_indices.append(i)
+
+            if llm_indices:
+                llm_indices = self._apply_embedding_routes(subgoals, results, llm_indices)
+
+            if llm_indices:
+                responses = self.chain.batch(
+                    [{"subgoal": subgoals[i], "tools": self._tools_repr} for i in llm_indices],
+                    config={"max_concurrency": 8}
+                )
+                for i, response in zip(llm_indices, responses):
+                    results[i] = self._resolve_response(response, subgoals[i])
+                    self._cache_put(subgoals[i], results[i])
+            return results
+        except Exception as e:
+            log_error(self.logger, e, "batch routing subgoals to tools")
+            raise
+
+    async def route_batch_async(self, subgoals: list[str]) -> list[tuple[BaseTool, str, bool]]:
+        """Async counterpart of route_batch, for event-loop callers.
+
+        Uses abatch so the per-subgoal routing calls run concurrently on
+        the loop itself instead of tying up a worker thread per layer.
+        """
+        try:
+            results: list = [None] * len(subgoals)
+            llm_indices = []
+            for i, subgoal in enumerate(subgoals):
+                fast = self._fast_route(subgoal) or self._cache_get(subgoal)
+                if fast is not None:
+                    results[i] = fast
+                else:
+                    llm_indices.append(i)
+
+            if llm_indices:
+                llm_indices = await asyncio.to_thread(self._apply_embedding_routes, subgoals, results, llm_indices)
+
+            if llm_indices:
+                responses = await self.chain.abatch(
+                    [{"subgoal": subgoals[i], "tools": self._tools_repr} for i in llm_indices],
+                    config={"max_concurrency": 8}
+                )
+                for i, response in zip(llm_indices, responses):
+                    results[i] = self._resolve_response(response, subgoals[i])
+                    self._cache_put(subgoals[i], results[i])
+            return results
+        except Exception as e:
+            log_error(self.logger, e, "batch routing subgoals to tools")
+            raise
+
     def execute_tool(self, tool: BaseTool, subgoal: str, query: str, is_url: bool) -> Any:
         """Execute the selected tool with the subgoal."""
         # log_function_call(self.logger, "execute_tool", tool=tool.name, subgoal=subgoal)
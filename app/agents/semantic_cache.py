@@ -0,0 +1,75 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import faiss
+import numpy as np
+
+from app.utils.logging import setup_logger, log_error
+
+class SemanticResponseCache:
+    """LRU-bounded semantic cache mapping query embeddings to final responses.
+
+    Queries are embedded, L2-normalized and stored in a FAISS inner-product
+    index so that semantically identical (or near-identical) queries can be
+    answered from cache without re-running the full planner + subgoal workflow.
+    """
+
+    def __init__(self, embeddings, similarity_threshold: float = 0.87, max_size: int = 1000):
+        self.logger = setup_logger(f"{__name__}.SemanticResponseCache")
+        self.embeddings = embeddings
+        self.similarity_threshold = similarity_threshold
+        self.max_size = max_size
+        self.index = None  # Built lazily on first put, once embedding dim is known
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._next_id = 0
+        self.logger.info(
+            f"Initialized SemanticResponseCache (threshold={similarity_threshold}, max_size={max_size})"
+        )
+
+    def _embed(self, query: str) -> np.ndarray:
+        """Embed a query and L2-normalize it for cosine similarity via inner product."""
+        vector = np.asarray(self.embeddings.embed_query(query), dtype="float32").reshape(1, -1)
+        faiss.normalize_L2(vector)
+        return vector
+
+    def get(self, query: str) -> Optional[Dict[str, Any]]:
+        """Return the cached response for a semantically similar query, or None on miss."""
+        try:
+            if self.index is None or not self._entries:
+                return None
+
+            vector = self._embed(query)
+            scores, ids = self.index.search(vector, 1)
+            score, entry_id = float(scores[0][0]), int(ids[0][0])
+
+            if entry_id == -1 or score < self.similarity_threshold:
+                return None
+
+            # Refresh LRU position on hit
+            self._entries.move_to_end(entry_id)
+            self.logger.info(f"Semantic cache hit (score={score:.3f}) for query: {query}")
+            return self._entries[entry_id]
+
+        except Exception as e:
+            log_error(self.logger, e, "semantic cache lookup")
+            return None
+
+    def put(self, query: str, response: Dict[str, Any]) -> None:
+        """Store a response keyed by the query embedding, evicting the LRU entry if full."""
+        try:
+            vector = self._embed(query)
+
+            if self.index is None:
+                self.index = faiss.IndexIDMap(faiss.IndexFlatIP(vector.shape[1]))
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self.index.add_with_ids(vector, np.array([entry_id], dtype="int64"))
+            self._entries[entry_id] = response
+
+            if len(self._entries) > self.max_size:
+                oldest_id, _ = self._entries.popitem(last=False)
+                self.index.remove_ids(np.array([oldest_id], dtype="int64"))
+
+        except Exception as e:
+            log_error(self.logger, e, "semantic cache update")
@@ -1,13 +1,54 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any
-from app.agents.memory import MemoryManager
+
+@dataclass(slots=True)
+class Subgoal:
+    """A single planned subgoal and its execution state."""
+    order_number: int
+    description: str
+    depends_on: list[str] = field(default_factory=list)
+    completed: bool = False
+    skipped: bool = False
+    retries: int = 0
+    tool: str | None = None
+    query: str | None = None
+    is_url: bool = False
+    result: Any = None
+    feedback: str = ""
+    retry: bool = False
+    reviewed: bool = False
 
 @dataclass
 class AgentState:
-    """Represents the current state of the agent system."""
+    """Represents the current state of the agent system.
+
+    Every field is checkpointed by the workflow's MemorySaver, so the state
+    must stay limited to plain serializable data — live services such as the
+    MemoryManager belong on the agent instance, not here.
+    """
     task: str
     query: str
-    subgoals: list[dict[str, Any]]
+    subgoals: list[Subgoal]
     current_subgoal_index: int
-    memory: MemoryManager
-    final_response: str | dict[str, Any] = ""
\ No newline at end of file
+    final_response: str | dict[str, Any] = ""
+    layers: list[list[int]] = field(default_factory=list)
+    order_to_index: dict[str, int] = field(default_factory=dict)
+    curr_date: str = ""  # Computed once per request instead of per subgoal
+
+    def unexecuted(self, indices: list[int]) -> list[int]:
+        """Indices at or past the cursor whose subgoals still need execution."""
+        return [
+            i for i in indices
+            if i >= self.current_subgoal_index
+            and self.subgoals[i].result is None
+            and not self.subgoals[i].skipped
+        ]
+
+    def unreviewed(self, indices: list[int]) -> list[int]:
+        """Indices at or past the cursor whose subgoals still need review."""
+        return [
+            i for i in indices
+            if i >= self.current_subgoal_index
+            and not self.subgoals[i].skipped
+            and not self.subgoals[i].reviewed
+        ]
\ No newline at end of file
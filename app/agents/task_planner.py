@@ -1,50 +1,164 @@
-from pydantic import BaseModel, Field, AliasChoices
+import asyncio
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 from langchain_openai import ChatOpenAI
-from app.prompts.task_planner import TASK_PLANNING_PROMPT
+from app.agents.state import Subgoal
+from app.prompts.task_planner import TASK_PLANNING_PROMPT, select_planner_examples
+from app.prompts._canonical import canonical
+from app.utils.models import MODEL_TIERS
 from app.utils.logging import setup_logger, log_function_call, log_error, log_function_result
-from typing import Any
+from typing import Any, Callable
 from datetime import datetime
+from functools import lru_cache
 
 class GoalSchema(BaseModel):
     """Schema for individual subgoals."""
+    model_config = ConfigDict(extra='ignore', validate_assignment=False, populate_by_name=True)
+
     order_number: int = Field(description="Order number of the subgoal in the sequence. This is used to maintain the order of subgoals. It is 1-indexed.")
     description: str = Field(description="Description of the subgoal to be achieved.")
     depends_on: list[str] | None = Field(default_factory=list, description="List of subgoals that this subgoal depends on.")
 
 class TaskPlannerSchema(BaseModel):
     """Schema for task planning output. Always use this to structure response to user queries."""
-    subgoals: list[GoalSchema] | str | None = Field(description="List of subgoals generated from the complex query.", validation_alias=AliasChoices("subgoals", "Subgoals", "**subgoals**", "**Subgoals**"))
+    model_config = ConfigDict(extra='ignore', validate_assignment=False, populate_by_name=True)
+
+    subgoals: list[GoalSchema] | str | None = Field(description="List of subgoals generated from the complex query.")
     explanation: str = "Reasoning for why the plan was broken down into these subgoals based on the user query, context and available tools."
 
+    @model_validator(mode="before")
+    @classmethod
+    def _normalize_keys(cls, data):
+        # One-shot normalization of LLM key variants ("Subgoals",
+        # "**subgoals**") instead of per-field AliasChoices lists
+        if isinstance(data, dict):
+            data = {k.strip("*").strip().lower(): v for k, v in data.items()}
+        return data
+
+@lru_cache(maxsize=None)
+def _build_llm(rate_limiter=None):
+    """Build the structured-output planning model once per rate limiter.
+
+    with_structured_output re-derives the JSON schema from the Pydantic
+    model, so caching makes per-session TaskPlanner construction O(1) and
+    shares the underlying HTTP client.
+    """
+    llm = ChatOpenAI(model=MODEL_TIERS["planner"], temperature=0, rate_limiter=rate_limiter)
+    return llm.with_structured_output(TaskPlannerSchema, method='json_schema', strict=True)
+
+@lru_cache(maxsize=1024)
+def _render_planning_prompt(date: str, query: str, context: str):
+    """Memoize the rendered planning messages per input triple.
+
+    The planning template is by far the largest in the app, and Streamlit
+    reruns resubmit identical inputs; a cache hit skips re-templating the
+    multi-KB system message entirely. Exemplar selection lives behind the
+    same cache, so a hit also skips the embedding lookup.
+    """
+    return TASK_PLANNING_PROMPT.invoke({
+        "date": date,
+        "query": query,
+        "context": context,
+        "examples": select_planner_examples(query),
+    })
+
 class TaskPlanner:
     """Task Planner that decomposes complex queries into actionable subgoals."""
     def __init__(self, rate_limiter):
-        self.llm = ChatOpenAI(model="gpt-4o", temperature=0, rate_limiter=rate_limiter)
-        self.llm = self.llm.with_structured_output(TaskPlannerSchema, method='json_schema', strict=True)
-        self.chain = TASK_PLANNING_PROMPT | self.llm
+        self.llm = _build_llm(rate_limiter)
         self.logger = setup_logger(f"{__name__}.TaskPlanner")
 
-    def plan(self, query: str, context: str) -> tuple[list[dict[str, Any], str]]:
+    def _parse_response(self, response) -> tuple[list[Subgoal], str]:
+        """Turn a planning chain response into Subgoal records."""
+        response = response.model_dump()
+        self.logger.debug("Chain response: %s", response)
+
+        subgoals = response.get('subgoals', [])
+
+        if subgoals is None or (isinstance(subgoals, str) and subgoals.strip() in ["", "null"]):
+            error_msg = "I couldn't break down your query into actionable steps. Could you please rephrase it?"
+            return error_msg
+
+        self.logger.info("Task planning explanation: %s", response.get('explanation'))
+
+        subgoals = [
+            Subgoal(
+                order_number=subgoal["order_number"],
+                description=subgoal["description"],
+                depends_on=subgoal.get("depends_on") or []
+            )
+            for subgoal in subgoals
+        ]
+        return subgoals, response.get('explanation')
+
+    def plan(self, query: str, context: str, curr_date: str | None = None) -> tuple[list[Subgoal], str]:
         """Break down a complex query into structured subgoals."""
         # log_function_call(self.logger, "plan", query=query, context=context)
         try:
-            curr_date = datetime.now().strftime("%Y-%m-%d")
-            response = self.chain.invoke({"date": curr_date, "query": query, "context": context}).model_dump()
-            self.logger.debug(f"Chain response: {response}")
+            if curr_date is None:
+                curr_date = datetime.now().strftime("%Y-%m-%d")
+            # canonical() keeps structured context byte-stable for prefix caching
+            response = self.llm.invoke(_render_planning_prompt(curr_date, query, canonical(context)))
+            return self._parse_response(response)
+        except Exception as e:
+            log_error(self.logger, e, "planning subgoals")
+            raise
 
-            subgoals = response.get('subgoals', [])
+    async def plan_async(self, query: str, context: str, curr_date: str | None = None) -> tuple[list[Subgoal], str]:
+        """Async counterpart of plan for event-loop callers."""
+        try:
+            if curr_date is None:
+                curr_date = datetime.now().strftime("%Y-%m-%d")
+            # Rendering may hit the embedding API for exemplar selection, so
+            # keep it off the event loop
+            prompt = await asyncio.to_thread(_render_planning_prompt, curr_date, query, canonical(context))
+            response = await self.llm.ainvoke(prompt)
+            return self._parse_response(response)
+        except Exception as e:
+            log_error(self.logger, e, "planning subgoals")
+            raise
 
-            if subgoals is None or (isinstance(subgoals, str) and subgoals.strip() in ["", "null"]):
-                error_msg = "I couldn't break down your query into actionable steps. Could you please rephrase it?"
-                return error_msg
+    async def plan_stream_async(self, query: str, context: str, curr_date: str | None = None,
+                                on_subgoal: Callable[[dict], None] | None = None) -> tuple[list[Subgoal], str]:
+        """Plan asynchronously, surfacing subgoals while the plan decodes.
+
+        on_subgoal is called with each dependency-free subgoal dict as soon
+        as its JSON object has closed in the stream — while the model is
+        still decoding the rest of the plan — so the caller can overlap
+        routing or other prep work with the remaining decode. A subgoal is
+        considered closed once a later element has started; single-subgoal
+        plans therefore skip the incremental bookkeeping entirely. Falls
+        back to a plain ainvoke if structured streaming is unavailable.
+        """
+        try:
+            if curr_date is None:
+                curr_date = datetime.now().strftime("%Y-%m-%d")
+            prompt = await asyncio.to_thread(_render_planning_prompt, curr_date, query, canonical(context))
 
-            self.logger.info(f"Task planning explanation: {response.get('explanation')}")
+            response = None
+            surfaced = 0
+            try:
+                async for partial in self.llm.astream(prompt):
+                    response = partial
+                    if on_subgoal is None:
+                        continue
+                    subgoals = partial.get("subgoals") if isinstance(partial, dict) else getattr(partial, "subgoals", None)
+                    if not isinstance(subgoals, list):
+                        continue
+                    # Every element before the last has fully closed
+                    while surfaced < len(subgoals) - 1:
+                        subgoal = subgoals[surfaced]
+                        if isinstance(subgoal, BaseModel):
+                            subgoal = subgoal.model_dump()
+                        if isinstance(subgoal, dict) and not subgoal.get("depends_on"):
+                            on_subgoal(subgoal)
+                        surfaced += 1
+            except Exception as stream_error:
+                self.logger.debug("Structured stream unavailable (%s), using ainvoke", stream_error)
+                response = await self.llm.ainvoke(prompt)
 
-            for subgoal in subgoals:
-                subgoal["retries"] = 0
-                subgoal["completed"] = False
-                subgoal["result"] = None
-            return subgoals, response.get('explanation')
+            if isinstance(response, dict):
+                response = TaskPlannerSchema.model_validate(response)
+            return self._parse_response(response)
         except Exception as e:
             log_error(self.logger, e, "planning subgoals")
             raise
\ No newline at end of file
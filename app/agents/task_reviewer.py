@@ -1,12 +1,16 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from langchain_openai import ChatOpenAI
-from app.prompts.task_planner import TASK_REVIEW_PROMPT
+from app.prompts.task_planner import TASK_REVIEW_PROMPT, TASK_REVIEW_BATCH_PROMPT
 from app.utils.logging import setup_logger, log_function_call, log_function_result, log_error
 from app.agents.state import AgentState
 from datetime import datetime
+from functools import lru_cache
+from app.utils.models import MODEL_TIERS
 
 class TaskReviewerSchema(BaseModel):
     """Schema for task review output. Always use this to structure subgoal review responses."""
+    model_config = ConfigDict(extra='ignore', validate_assignment=False, populate_by_name=True)
+
     completed: bool = Field(description="Indicates if the subgoal was successfully completed.")
     description: str = Field(description="Description of the subgoal being reviewed.")
     feedback: str = Field(description="Feedback on the subgoal, if applicable to improve output.")
@@ -14,54 +18,163 @@ class TaskReviewerSchema(BaseModel):
     query: str | None = Field(description="The new input to the tool if it needs to be retried based on the tool's output, the subgoal being solved, the tool being used, and the feedback provided.")
     is_url: bool = Field(description="Indicator flagging if the query is a URL, allowing the document_summarizer tool to either get data from the URL or summarize the text directly.")
 
+class TaskReviewerBatchSchema(BaseModel):
+    """Schema for row-marshalled review output covering several subgoals."""
+    model_config = ConfigDict(extra='ignore', validate_assignment=False, populate_by_name=True)
+
+    reviews: list[TaskReviewerSchema] = Field(description="One review per numbered subgoal, in the same order as the subgoals appear in the prompt.")
+
+@lru_cache(maxsize=None)
+def _build_chain(rate_limiter=None):
+    """Build the structured-output review chain once per rate limiter.
+
+    Caching avoids re-deriving the JSON schema and re-creating the HTTP
+    client for every TaskReviewer (one per Streamlit session).
+    """
+    llm = ChatOpenAI(model=MODEL_TIERS["reviewer"], temperature=0, rate_limiter=rate_limiter)
+    llm = llm.with_structured_output(TaskReviewerSchema, method='json_schema', strict=True)
+    return TASK_REVIEW_PROMPT | llm
+
+@lru_cache(maxsize=None)
+def _build_batch_chain(rate_limiter=None):
+    """Build the row-marshalled review chain once per rate limiter.
+
+    Packing a layer's subgoals into one prompt replaces N structured-output
+    round-trips with a single one, so a layer's review cost stops scaling
+    with its width on rate-limited endpoints.
+    """
+    llm = ChatOpenAI(model=MODEL_TIERS["reviewer"], temperature=0, rate_limiter=rate_limiter)
+    llm = llm.with_structured_output(TaskReviewerBatchSchema, method='json_schema', strict=True)
+    return TASK_REVIEW_BATCH_PROMPT | llm
+
+# Cap on subgoals marshalled into one review prompt; wider layers are
+# reviewed in chunks so individual requests stay well inside context limits
+_BATCH_REVIEW_SIZE = 8
+
 class TaskReviewer:
     """Task Reviewer that evaluates subgoal results and decides next steps."""
-    
+
     def __init__(self, rate_limiter, max_retries: int = 3):
         self.logger = setup_logger(f"{__name__}.TaskReviewer")
         self.logger.info("Initialized TaskReviewer")
         self.max_retries = max_retries
-        self.llm = ChatOpenAI(model="gpt-4o", temperature=0, rate_limiter=rate_limiter)
-        self.llm = self.llm.with_structured_output(TaskReviewerSchema, method='json_schema', strict=True)
-        self.chain = TASK_REVIEW_PROMPT | self.llm
+        self.chain = _build_chain(rate_limiter)
+        self.batch_chain = _build_batch_chain(rate_limiter)
         self.logger.info("TaskReviewer chain initialized")
 
-    def review(self, state: AgentState) -> bool:
-        """Review the result of a subgoal and determine if it meets the requirements."""
-        # log_function_call(self.logger, "review", subgoal=state.subgoals[state.current_subgoal_index])
-        subgoal = state.subgoals[state.current_subgoal_index]
+    def _layer_pending(self, state: AgentState) -> list[int]:
+        """Unreviewed indices in the current subgoal's DAG layer."""
+        layer = next(
+            (layer for layer in state.layers if state.current_subgoal_index in layer),
+            [state.current_subgoal_index]
+        )
+        return state.unreviewed(layer)
+
+    def _build_review_prompts(self, state: AgentState, indices: list[int]) -> list[dict]:
+        """Build one review prompt dict per subgoal index."""
+        # Use the request-level date; it's invariant for the whole turn
+        curr_date = state.curr_date or datetime.now().strftime("%Y-%m-%d")
+
+        prompts = []
+        for i in indices:
+            subgoal = state.subgoals[i]
+            self.logger.info("Reviewing subgoal: %s", subgoal.description)
+
+            subgoal_result = subgoal.result or {}
+            subgoal_result = subgoal_result.get('result', '') if subgoal_result.get('type') == 'text' else subgoal_result.get('query')
+
+            prompts.append({
+                "date": curr_date,
+                "subgoal": subgoal.description,
+                "tool": subgoal.tool or 'web_search',
+                "result": subgoal_result,
+                "query": subgoal.query or ''
+            })
+        return prompts
+
+    def _marshal_entries(self, prompts: list[dict]) -> dict:
+        """Pack per-subgoal prompt dicts into one batched prompt's inputs."""
+        entries = "\n\n".join(
+            f"Subgoal {n}: {p['subgoal']}\n"
+            f"Tool used: {p['tool']}\n"
+            f"Input to tool: {p['query']}\n"
+            f"Tool output: {p['result']}"
+            for n, p in enumerate(prompts, start=1)
+        )
+        return {"date": prompts[0]["date"], "count": len(prompts), "entries": entries}
+
+    def _apply_reviews(self, state: AgentState, indices: list[int], responses: list) -> AgentState:
+        """Write batched review responses back onto their subgoals."""
+        for i, response in zip(indices, responses):
+            subgoal = state.subgoals[i]
+            response = response.model_dump()
+
+            # Update subgoal based on review
+            subgoal.completed = response.get('completed', True)
+            subgoal.feedback = response.get('feedback', '')
+            subgoal.retry = response.get('retry', False)
+            subgoal.query = response.get('query') or subgoal.query
+            subgoal.is_url = response.get('is_url', False)
+            subgoal.reviewed = True
+            self.logger.debug("Subgoal after review: %s", subgoal)
+        return state
+
+    def review(self, state: AgentState) -> AgentState:
+        """Review the current subgoal's DAG layer in one batched chain call.
+
+        Subgoals in a layer are executed together, so their results are all
+        available by the time the first of them reaches review. Reviewing
+        the whole layer at once collapses N review round-trips into one
+        batched call; later graph iterations find the review already
+        recorded and skip straight to the retry decision.
+        """
+        try:
+            return self.review_batch(state, self._layer_pending(state))
+        except Exception as e:
+            log_error(self.logger, e, "reviewing subgoal")
+            raise
+
+    async def review_async(self, state: AgentState) -> AgentState:
+        """Async counterpart of review, used as the workflow node."""
         try:
-            if not subgoal.get('skipped', False):
-                self.logger.info(f"Reviewing subgoal: {subgoal['description']}")
-
-                curr_date = datetime.now().strftime("%Y-%m-%d")
-
-                subgoal_result = subgoal.get('result', {})
-                subgoal_result = subgoal_result.get('result', '') if subgoal_result.get('type') == 'text' else subgoal_result.get('query')
-
-                response = self.chain.invoke({
-                    "date": curr_date,
-                    "subgoal": subgoal['description'],
-                    "tool": subgoal.get('tool', 'web_search'),
-                    "result": subgoal_result,
-                    "query": subgoal.get('query', '')
-                }).model_dump()
-
-                # self.logger.debug(f"Chain response: {response}")
-
-                # self.logger.debug(f"Review result: {response}")
-                # Update subgoal based on review
-                subgoal['completed'] = response.get('completed', True)
-                subgoal['feedback'] = response.get('feedback', '')
-                subgoal['retry'] = response.get('retry', False)
-                subgoal['query'] = response.get('query', subgoal['query'])
-                subgoal['is_url'] = response.get('is_url', False)
-                self.logger.debug(f"Subgoal after review: {subgoal}")
-                state.subgoals[state.current_subgoal_index] = subgoal
-            return state
+            indices = self._layer_pending(state)
+            if not indices:
+                return state
+            prompts = self._build_review_prompts(state, indices)
+            if len(indices) == 1:
+                responses = [await self.chain.ainvoke(prompts[0])]
+            else:
+                # Marshal the layer into single prompts, one call per chunk
+                responses = []
+                for start in range(0, len(prompts), _BATCH_REVIEW_SIZE):
+                    chunk = prompts[start:start + _BATCH_REVIEW_SIZE]
+                    response = await self.batch_chain.ainvoke(self._marshal_entries(chunk))
+                    responses.extend(response.reviews[:len(chunk)])
+            return self._apply_reviews(state, indices, responses)
         except Exception as e:
             log_error(self.logger, e, "reviewing subgoal")
             raise
+
+    def review_batch(self, state: AgentState, indices: list[int]) -> AgentState:
+        """Review the given subgoals with a single batched chain call."""
+        # log_function_call(self.logger, "review_batch", indices=indices)
+        try:
+            if not indices:
+                return state
+
+            prompts = self._build_review_prompts(state, indices)
+            if len(indices) == 1:
+                responses = [self.chain.invoke(prompts[0])]
+            else:
+                responses = []
+                for start in range(0, len(prompts), _BATCH_REVIEW_SIZE):
+                    chunk = prompts[start:start + _BATCH_REVIEW_SIZE]
+                    response = self.batch_chain.invoke(self._marshal_entries(chunk))
+                    responses.extend(response.reviews[:len(chunk)])
+            return self._apply_reviews(state, indices, responses)
+        except Exception as e:
+            log_error(self.logger, e, "batch reviewing subgoals")
+            raise
         
     def should_retry(self, state: AgentState) -> str:
         """Determine if a subgoal should be retried based on the review."""
@@ -69,29 +182,29 @@ class TaskReviewer:
         # log_function_call(self.logger, "should_retry", subgoal=subgoal)
         try:
             # If the subgoal was skipped due to dependencies, continue to next
-            if subgoal.get('skipped', False):
-                self.logger.info(f"Subgoal '{subgoal['description']}' was skipped. Moving to next.")
+            if subgoal.skipped:
+                self.logger.info("Subgoal %r was skipped. Moving to next.", subgoal.description)
                 return "continue"
-            
+
             # If not completed but has an error indicating permanent failure
-            if not subgoal.get('completed', False):
-                self.logger.info(f"Task failed due to: {subgoal.get('feedback')}") 
+            if not subgoal.completed:
+                self.logger.info("Task failed due to: %s", subgoal.feedback)
 
                 # Check if error was due to URL/document not having correct information to solve task
-                if subgoal.get('is_url', False) and 'error' not in subgoal.get('feedback'):
-                    self.logger.info(f"The information found was not relevant to the task. No need to retry task.")
+                if subgoal.is_url and 'error' not in (subgoal.feedback or ''):
+                    self.logger.info("The information found was not relevant to the task. No need to retry task.")
                     return "continue"
 
                 # Check retry count
-                retries = subgoal.get('retries', 0)
+                retries = subgoal.retries
                 if retries < self.max_retries:
-                    self.logger.info(f"Subgoal '{subgoal['description']}' needs retry. Current retries: {retries}, Max retries: {self.max_retries}")
+                    self.logger.info("Subgoal %r needs retry. Current retries: %s, Max retries: %s", subgoal.description, retries, self.max_retries)
                     return 'retry'
                 else:
-                    self.logger.warning(f"Subgoal '{subgoal['description']}' reached max retries. Not retrying.")
+                    self.logger.warning("Subgoal %r reached max retries. Not retrying.", subgoal.description)
                     return "continue"
             else:
-                self.logger.info(f"Subgoal '{subgoal['description']}' is complete. No retry needed.")
+                self.logger.info("Subgoal %r is complete. No retry needed.", subgoal.description)
                 return "continue"
         except Exception as e:
             log_error(self.logger, e, "checking if subgoal should be retried")
@@ -1,52 +1,182 @@
-import json
+import atexit
+import orjson
+import queue
+import threading
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
-from app.evaluator.prompts import TASK_SUCCESS_PROMPT, TOOL_USE_PROMPT, COHERENCE_REASONING_PROMPT
+from app.evaluator.prompts import TASK_SUCCESS_PARTS, TOOL_USE_PARTS, COHERENCE_REASONING_PARTS, render
 from langchain_openai import ChatOpenAI
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+from app.utils.models import MODEL_TIERS
 
 EVAL_OUTPUT_FILE = Path(__file__).parent / "evaluation_results.jsonl"
 
 class EvalOutput(BaseModel):
+    model_config = ConfigDict(extra='ignore', validate_assignment=False, populate_by_name=True)
+
     score: str = Field(description="The score of the evaluation.")
     justification: str = Field(description="A brief explanation for why the score was given.")
 
+class EvalBatchOutput(BaseModel):
+    """Structured output for evaluating several criteria in one call."""
+    model_config = ConfigDict(extra='ignore', validate_assignment=False, populate_by_name=True)
+
+    results: list[EvalOutput] = Field(description="One evaluation per numbered criterion, in the same order as presented.")
+
+_METRIC_PROMPTS = {
+    "task_success": TASK_SUCCESS_PARTS,
+    "tool_use": TOOL_USE_PARTS,
+    "coherence_reasoning": COHERENCE_REASONING_PARTS,
+}
+
+@lru_cache(maxsize=None)
+def _build_llms(model: str, temperature: float):
+    """Build the structured-output eval models once per configuration."""
+    llm = ChatOpenAI(model=model, temperature=temperature).with_structured_output(EvalOutput, method='json_schema', strict=True)
+    batch_llm = ChatOpenAI(model=model, temperature=temperature).with_structured_output(EvalBatchOutput, method='json_schema', strict=True)
+    return llm, batch_llm
+
+@lru_cache(maxsize=1024)
+def _invoke_cached(model: str, temperature: float, prompt: str):
+    """Invoke the eval model, memoizing identical prompts.
+
+    temperature=0 makes the call deterministic, so repeated evaluations of
+    the same output (plan retries, Streamlit reruns) hit the cache instead
+    of the network.
+    """
+    llm, _ = _build_llms(model, temperature)
+    return llm.invoke(prompt)
+
 class AgentEvaluator:
     """Evaluator for Agent outputs"""
-    def __init__(self, model="gpt-4o-mini", temperature=0):
-        self.llm = ChatOpenAI(model=model, temperature=temperature).with_structured_output(EvalOutput, method='json_schema', strict=True)
+    def __init__(self, model=MODEL_TIERS["evaluator"], temperature=0):
+        self.model = model
+        self.temperature = temperature
+        self.llm, self.batch_llm = _build_llms(model, temperature)
+
+        # Keep one buffered append handle open for the lifetime of the
+        # evaluator instead of an open/write/close cycle per record; the
+        # file is an append-only log, so a long-lived FD is safe. Opened
+        # lazily on the first save so importing the package never touches
+        # disk. Flush periodically and close on interpreter shutdown.
+        self._fh = None
+        self._fh_lock = threading.Lock()
+        self._writes_since_flush = 0
+        self._flush_every = 8
+        atexit.register(self._close)
+
+        # Evaluation is telemetry: callers enqueue specs and return
+        # immediately while a single daemon worker drains the queue, so
+        # LLM-judge latency never lands on the request path
+        self._q: queue.Queue = queue.Queue()
+        self._worker_thread = threading.Thread(target=self._worker, daemon=True, name="evaluator")
+        self._worker_thread.start()
+        # Registered after _close, so it runs first on shutdown (atexit is LIFO)
+        atexit.register(self._drain)
+
+    def _close(self):
+        with self._fh_lock:
+            if self._fh is not None and not self._fh.closed:
+                self._fh.close()
+
+    def _worker(self):
+        while True:
+            specs = self._q.get()
+            if specs is None:
+                break
+            try:
+                self.evaluate_many(specs)
+            except Exception:
+                # Telemetry failures must never kill the worker
+                pass
+            finally:
+                self._q.task_done()
+
+    def _drain(self):
+        """Let queued evaluations finish before interpreter shutdown."""
+        self._q.put(None)
+        self._worker_thread.join(timeout=30)
+
+    def enqueue(self, specs: list[dict]) -> None:
+        """Queue evaluation specs for the background worker (fire-and-forget)."""
+        self._q.put(specs)
 
     def evaluate(self, metric: str, **kwargs):
         """Method to evaluate a single output based on a metric. Possible metrics are ['task_success', 'tool_use', 'coherence_reasoning']"""
-        if metric == "task_success":
-            prompt = TASK_SUCCESS_PROMPT.format(**kwargs)
-        elif metric == "tool_use":
-            prompt = TOOL_USE_PROMPT.format(**kwargs)
-        elif metric == "coherence_reasoning":
-            prompt = COHERENCE_REASONING_PROMPT.format(**kwargs)
-        else:
+        parts = _METRIC_PROMPTS.get(metric)
+        if parts is None:
             raise ValueError("Unknown metric")
-        response = self.llm.invoke(prompt).model_dump()
+        prompt = render(parts, kwargs)
+        response = _invoke_cached(self.model, self.temperature, prompt).model_dump()
         self.save_evaluation(response)
         return response
 
+    def evaluate_many(self, specs: list[dict]):
+        """Evaluate several metrics on the same output with a single LLM call.
+
+        Each spec is a dict with a 'metric' key plus the format kwargs for
+        that metric's prompt. The criteria are concatenated into one prompt
+        so N evaluations cost one LLM invocation instead of N.
+        """
+        sections = []
+        for i, spec in enumerate(specs):
+            metric = spec.get("metric")
+            parts = _METRIC_PROMPTS.get(metric)
+            if parts is None:
+                raise ValueError("Unknown metric")
+            kwargs = {k: v for k, v in spec.items() if k != "metric"}
+            sections.append(f"Criterion {i + 1} ({metric}):{render(parts, kwargs)}")
+
+        prompt = (
+            "Evaluate each of the following criteria independently and return "
+            "one score with justification per criterion, in order.\n\n"
+            + "\n\n".join(sections)
+        )
+        response = self.batch_llm.invoke(prompt).model_dump()
+
+        results = []
+        for spec, result in zip(specs, response.get("results", [])):
+            result = {"metric": spec.get("metric"), **result}
+            self.save_evaluation(result)
+            results.append(result)
+        return results
+
     def evaluate_all(self, query, output, tool=None, save=True, extra_info=None):
+        # The three metrics are independent, so run them as one concurrent
+        # batch instead of three serial round-trips; wall time becomes
+        # max(call) rather than sum(call)
+        responses = self.llm.batch([
+            render(TASK_SUCCESS_PARTS, {"query": query, "output": output}),
+            render(TOOL_USE_PARTS, {"query": query, "tool": tool or "N/A", "output": output}),
+            render(COHERENCE_REASONING_PARTS, {"output": output}),
+        ])
         results = {
             "timestamp": datetime.utcnow().isoformat(),
             "query": query,
             "output": output,
             "tool": tool or "N/A",
-            "task_success": self.evaluate("task_success", query=query, output=output),
-            "tool_use": self.evaluate("tool_use", query=query, tool=tool or "N/A", output=output),
-            "coherence_reasoning": self.evaluate("coherence_reasoning", output=output),
+            "task_success": responses[0].model_dump(),
+            "tool_use": responses[1].model_dump(),
+            "coherence_reasoning": responses[2].model_dump(),
         }
         if extra_info:
             results["extra_info"] = extra_info
+        # Save the combined record only — the old per-metric evaluate()
+        # calls each wrote their own line, tripling file writes
         if save:
             self.save_evaluation(results)
         return results
 
-    @staticmethod
-    def save_evaluation(result):
-        with open(EVAL_OUTPUT_FILE, "a", encoding="utf-8") as f:
-            f.write(json.dumps(result, ensure_ascii=False) + "\n")
+    def save_evaluation(self, result):
+        # orjson serializes straight to bytes, so the append handle is
+        # binary and no str->bytes encode happens on write
+        line = orjson.dumps(result, option=orjson.OPT_APPEND_NEWLINE)
+        with self._fh_lock:
+            if self._fh is None:
+                self._fh = open(EVAL_OUTPUT_FILE, "ab", buffering=1 << 16)
+            self._fh.write(line)
+            self._writes_since_flush += 1
+            if self._writes_since_flush >= self._flush_every:
+                self._fh.flush()
+                self._writes_since_flush = 0
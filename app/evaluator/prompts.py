@@ -1,5 +1,7 @@
 # Prompts for agent evaluation metrics
 
+import re
+
 TASK_SUCCESS_PROMPT = """
 You are an expert evaluator. Given the user query and the agent's output, rate the output for Task Success on a scale of 1-5:
 - 5: Fully and correctly solves the user's task.
@@ -38,3 +40,30 @@ You are an expert evaluator. Given the agent's output, rate Coherence and Reason
 Agent Output: {output}
 Score (1-5) and a brief justification:
 """
+
+
+def _split_template(template: str) -> tuple[list[str], list[str]]:
+    """Split a template into literal parts and placeholder keys at import.
+
+    str.format rescans and reparses the format spec on every call; the
+    evaluator renders these templates on every metric, so pre-splitting
+    them once makes rendering a plain join over the parts.
+    """
+    parts = re.split(r"\{(\w+)\}", template)
+    return parts[0::2], parts[1::2]
+
+
+TASK_SUCCESS_PARTS = _split_template(TASK_SUCCESS_PROMPT)
+TOOL_USE_PARTS = _split_template(TOOL_USE_PROMPT)
+COHERENCE_REASONING_PARTS = _split_template(COHERENCE_REASONING_PROMPT)
+
+
+def render(parts: tuple[list[str], list[str]], values: dict) -> str:
+    """Render a pre-split template with the given values."""
+    literals, keys = parts
+    out = []
+    for literal, key in zip(literals, keys):
+        out.append(literal)
+        out.append(str(values[key]))
+    out.append(literals[-1])
+    return "".join(out)
@@ -1,4 +1,5 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from dotenv import load_dotenv
 load_dotenv()
 from app.agents.core import FinancialAgent
@@ -22,9 +23,27 @@ logger.debug("Streamlit page configured")
 if 'messages' not in st.session_state:
     st.session_state.messages = []
     logger.debug("Initialized empty messages in session state")
-if 'financial_agent' not in st.session_state:
-    logger.info("Initializing FinancialAgent")
-    st.session_state['financial_agent'] = FinancialAgent()
+
+
+def _get_agent() -> FinancialAgent:
+    """Build one agent per browser session, sharing the heavy pieces.
+
+    The structured-output chains, chat clients and embeddings are memoized
+    at module level, so per-session construction no longer rebuilds them —
+    connection pooling still reuses keep-alive sockets across users. The
+    memory, semantic response cache and checkpointer thread ids stay
+    private to the session, so one user's conversation can never surface
+    in another's context or cache hits.
+    """
+    if "financial_agent" not in st.session_state:
+        ctx = get_script_run_ctx()
+        session_id = ctx.session_id if ctx else "financial_agent"
+        logger.info("Initializing FinancialAgent for session %s", session_id)
+        st.session_state.financial_agent = FinancialAgent(session_id=session_id)
+    return st.session_state.financial_agent
+
+
+financial_agent = _get_agent()
 
 # Set up the app title and description
 st.title("📊 FinAgent")
@@ -57,16 +76,6 @@ with st.container():
         with col2:
             submit = st.form_submit_button("🔍 Analyze", use_container_width=True)
 
-# Handle form submission
-if submit and user_input.strip():
-    # Add user message to chat history
-    st.session_state.messages.append({"role": "user", "content": user_input})
-    
-    # Get AI response
-    with st.spinner("Analyzing..."):
-        response = st.session_state['financial_agent'].process_query(user_input)
-        st.session_state.messages.append({"role": "assistant", "content": response})
-
 # Display chat messages in the chat container
 with chat_container:
     for message in st.session_state.messages:
@@ -97,12 +106,49 @@ with chat_container:
                         st.markdown(content["display"], unsafe_allow_html=True)
                 if "content" in content and content['content']:
                     # For regular text responses
+                    escaped_content = content['content'].replace('$', r'\$')
                     with st.container(border=True):
                         st.markdown(
                             f"""
                             <div style='padding: 1rem; border-radius: 0.5rem; margin-bottom: 0.5rem;'>
-                                <b>🤖 FinAgent:</b> {content['content'].replace('$', r'\$')}
+                                <b>🤖 FinAgent:</b> {escaped_content}
                             </div>
-                            """, 
+                            """,
                             unsafe_allow_html=True
-                        )
\ No newline at end of file
+                        )
+
+# Handle form submission after rendering history so the new exchange
+# streams in below it instead of blocking behind a spinner
+if submit and user_input.strip():
+    st.session_state.messages.append({"role": "user", "content": user_input})
+
+    with chat_container:
+        with st.container(border=True):
+            st.markdown(
+                f"""
+                <div style='padding: 1rem; border-radius: 0.5rem; margin-bottom: 0.5rem;'>
+                    <b>You:</b> {user_input}
+                </div>
+                """,
+                unsafe_allow_html=True
+            )
+        with st.container(border=True):
+            st.markdown("<b>🤖 FinAgent:</b>", unsafe_allow_html=True)
+            # Render tokens as the agent produces them; planning and tool
+            # execution still run first, but synthesis streams in live.
+            # Visualizations arrive via the sink rather than the token
+            # stream — write_stream escapes HTML, so streaming them would
+            # show raw base64 instead of images
+            visualizations = []
+            streamed = st.write_stream(
+                financial_agent.stream_query(user_input, viz_sink=visualizations)
+            )
+            display = "\n\n".join(visualizations) if visualizations else None
+            if display:
+                st.markdown(display, unsafe_allow_html=True)
+
+    response_text = streamed if isinstance(streamed, str) else "".join(streamed)
+    st.session_state.messages.append({
+        "role": "assistant",
+        "content": {"content": response_text, "display": display}
+    })
\ No newline at end of file
@@ -0,0 +1,17 @@
+"""Canonical serialization for dynamic prompt template fields."""
+
+import orjson
+
+
+def canonical(obj) -> str:
+    """Serialize a prompt field to a byte-identical string across runs.
+
+    Provider-side prompt caching hashes the rendered prefix, so the same
+    semantic input must always render to the same bytes. str() on dicts and
+    sets leaks insertion/hash order; sorting keys and using a compact, fixed
+    separator style removes that nondeterminism. Strings pass through
+    unchanged.
+    """
+    if isinstance(obj, str):
+        return obj
+    return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS).decode()
@@ -0,0 +1,17 @@
+"""Disk-backed loading for prompt bodies.
+
+The long system-prompt texts live as .md files under app/prompts/data
+instead of multi-KB string literals in the modules. Each body is read
+once per process on first use; preforked workers then share the
+page-cached file contents instead of each materialising its own copy at
+import time, and prompt wording can be revised without touching code.
+"""
+
+from functools import lru_cache
+from importlib import resources
+
+
+@lru_cache(maxsize=None)
+def load_prompt(name: str) -> str:
+    """Return the prompt body stored at app/prompts/data/<name>."""
+    return (resources.files("app.prompts") / "data" / name).read_text(encoding="utf-8")
@@ -0,0 +1,19 @@
+"""Canonical tool-description block shared by the planner and router prompts.
+
+Both prompts used to carry near-identical copies of these descriptions;
+one canonical text means one string object in memory and, more
+importantly, one identical byte sequence for provider-side prompt caching
+to key on from either call site.
+"""
+
+TOOL_CATALOG_BLOCK = """1) web_search: Use this tool when the subgoal requires fetching real-time, up-to-date information from the internet. This includes breaking financial news, general market trends, recent regulatory updates, or finding the URLs for specific company reports, analyst articles, or economic indicators. It's for information not available in a structured database or requiring current events. To get better results, use this tool to search for information about one entity at a time if information about multiple entities is required in the user query.
+    Keywords: "latest news", "current trends", "recent regulations", "find URL", "economic indicators".
+
+    2) calculator: Use this tool for precise mathematical operations, including basic arithmetic (addition, subtraction, multiplication, division), percentages, and specific financial calculations like Net Present Value (NPV), Return on Investment (ROI), debt-to-equity ratios, compound interest, or other quantitative financial metrics. It ensures numerical accuracy for any query involving calculations.
+    Keywords: "calculate", "what is the ROI", "NPV of", "percentage change", "determine the ratio".
+
+    3) code_executor: Use this tool when the subgoal involves executing Python code for advanced data analysis, manipulation, or visualization. This is ideal for retrieving historical stock data (e.g., using 'yfinance'), performing complex statistical analysis with 'pandas', generating charts (e.g., stock price trends, correlations) with 'matplotlib' or 'plotly', or running custom financial models.
+    Keywords: "plot", "visualize", "compare stock performance", "analyze data", "run a model", "historical data", "correlation".
+
+    4) document_summarizer: Use this tool when the subgoal requires processing and summarizing the content of a specific document or URL. This is ideal for lengthy financial reports (e.g., quarterly earnings, 10-K/10-Q filings), analyst research papers, or detailed articles where key insights, financial highlights, or specific figures need to be extracted and condensed. This tool can also handle obtaining reports via web scraping or API integrations if a direct URL or file is provided. A valid URL must be provided as the query along with the is_url flag being set to True, so the query can be used directly to fetch the content located at the URL. Extra text in the query field will cause the request to fail as only a URL is expected.
+    Keywords: "summarize report", "extract highlights from", "condense document", "key takeaways from URL", "analyze filing"."""
@@ -30,4 +30,7 @@ RESPONSE_SYNTHESIS_PROMPT = ChatPromptTemplate.from_messages([
     * Conclude with a **brief, engaging statement or a question** to encourage further interaction or confirm understanding.
     """),
     ("human", "Query: {query}\nResults:\n{results}\nAdditional Context: {context}\n\nPlease synthesize a comprehensive response that integrates these findings into a clear, natural-sounding answer to the user's query."),
-])
\ No newline at end of file
+])
+# Pin the variables so LangChain doesn't rescan the large system message
+# to re-infer them on every render
+RESPONSE_SYNTHESIS_PROMPT.input_variables = ["context", "query", "results"]
\ No newline at end of file
@@ -1,159 +1,169 @@
 """Prompts for the TaskPlanner component."""
 
+from functools import lru_cache
 from langchain.prompts import ChatPromptTemplate
+from langchain_core.messages import SystemMessage
+from app.prompts._loader import load_prompt
+from app.prompts._tools_catalog import TOOL_CATALOG_BLOCK
 
-TASK_PLANNING_PROMPT = ChatPromptTemplate.from_messages([
-    ("system", """You are a financial analysis task planner. Break down complex queries into specific, actionable subgoals. Consider the following tools available:
-
-    1) web_search: Use this tool when the subgoal requires fetching real-time, up-to-date information from the internet. This includes breaking financial news, general market trends, recent regulatory updates, or finding the URLs for specific company reports, analyst articles, or economic indicators. It's for information not available in a structured database or requiring current events. To get better results, use this tool to search for information about one entity at a time if information about multiple entities is required in the user query.
-    Keywords: "latest news", "current trends", "recent regulations", "find URL", "economic indicators".
-
-    2) calculator: Use this tool for precise mathematical operations, including basic arithmetic (addition, subtraction, multiplication, division), percentages, and specific financial calculations like Net Present Value (NPV), Return on Investment (ROI), debt-to-equity ratios, compound interest, or other quantitative financial metrics. It ensures numerical accuracy for any query involving calculations.
-    Keywords: "calculate", "what is the ROI", "NPV of", "percentage change", "determine the ratio".
-
-    3) code_executor: Use this tool when the subgoal involves executing Python code for advanced data analysis, manipulation, or visualization. This is ideal for retrieving historical stock data (e.g., using 'yfinance'), performing complex statistical analysis with 'pandas', generating charts (e.g., stock price trends, correlations) with 'matplotlib' or 'plotly', or running custom financial models.
-    Keywords: "plot", "visualize", "compare stock performance", "analyze data", "run a model", "historical data", "correlation".
-
-    4) document_summarizer: Use this tool when the subgoal requires processing and summarizing the content of a specific document or URL. This is ideal for lengthy financial reports (e.g., quarterly earnings, 10-K/10-Q filings), analyst research papers, or detailed articles where key insights, financial highlights, or specific figures need to be extracted and condensed. This tool can also handle obtaining reports via web scraping or API integrations if a direct URL or file is provided.
-    Keywords: "summarize report", "extract highlights from", "condense document", "key takeaways from URL", "analyze filing".
+# Few-shot examples for the planner, kept as data so only the ones
+# semantically closest to the incoming query are spliced into the prompt.
+# Sending all of them on every call paid prefill cost for examples that
+# were irrelevant to the query at hand.
+PLANNER_EXAMPLES = [
+    {
+        "query": "What are the latest news regarding Tesla's recent product announcements?",
+        "example": """**Query:** "What are the latest news regarding Tesla's recent product announcements?"
+**Context:** null
+* **subgoals:** [
+ {"1": "Find the latest news regarding Tesla's recent product announcements.",
+ "depends_on": []}]
+* **reasoning:** "The user query asks for the 'latest' news which can be obtained using the web_search tool. There is no further task required to complete this query\"""",
+    },
+    {
+        "query": "Calculate the Net Present Value (NPV) of a project with an initial investment of $100,000, expected cash flows of $30,000, $40,000, $50,000 over the next three years, and a discount rate of 10%.",
+        "example": """**Query:** "Calculate the Net Present Value (NPV) of a project with an initial investment of $100,000, expected cash flows of $30,000, $40,000, $50,000 over the next three years, and a discount rate of 10%."
+**Context:** null
+* **subgoals:** [
+ {"1": "Calculate the Net Present Value (NPV) of a project with an initial investment of $100,000, expected cash flows of $30,000, $40,000, $50,000 over the next three years, and a discount rate of 10%.",
+    "depends_on": []}]
+* **reasoning:** "The user query asks for the 'calcualtion' of a financial metric and provides all the needed information to perform the calcualtion. This can be done by a single task using the calculator tool.\"""",
+    },
+    {
+        "query": "Plot the stock performance of Apple (AAPL) and Microsoft (MSFT) over the last year and show their relative growth.",
+        "example": """**Query:** "Plot the stock performance of Apple (AAPL) and Microsoft (MSFT) over the last year and show their relative growth."
+**Context:** null
+* **subgoals:** [
+ {"1": "Retrieve historical stock data for Apple (AAPL) and Microsoft (MSFT) over the last year.", "depends_on": []},
+ {"2": "Plot a graph to show the growth of each company on the same plot for comaprison", "depends_on": ["1"]}
+* **reasoning:** "The user query asks to plot the performance of Apple and Microsoft over the last year and show their growth. This can be solved by breaking down the query into two tasks. First we need to obtain the historical data for both companies, which can be accompolished using the web_search tool. After the historical data is obtained, the graph can be plotted using the code_executor tool.\"""",
+    },
+    {
+        "query": "Summarize the key financial highlights from the earnings report located at https://example.com/apple_q4_2023_earnings.pdf.",
+        "example": """**Query:** "Summarize the key financial highlights from the earnings report located at https://example.com/apple_q4_2023_earnings.pdf."
+**Context:** null
+* **subgoals:** [
+ {"1": "Summarize the key financial highlights from the earnings report located at https://example.com/apple_q4_2023_earnings.pdf.",
+    "depends_on": []}]
+* **reasoning:** "The user query asks to summarize a report with a URL provided, so this can be accompolished using document_summarizer tool.\"""",
+    },
+    {
+        "query": "Find and summarize the Q1 2024 earnings report for Google.",
+        "example": """**Query:** "Find and summarize the Q1 2024 earnings report for Google."
+**Context:** null
+* **subgoals:** [
+ {"1": "Find the Q1 2024 earnings report for Google.",
+    "depends_on": []},
+ {"2": "Summarize the key financial highlights from the Q1 2024 earnings report for Google.",
+    "depends_on": ["1"]}
+]
+* **reasoning:** "The user query asks to summarize a report without a URL provided, so this can be accompolished by breaking this into subtasks. First we can use the web_search tool to find the URL for the Q1 2024 earnings report for Google. Then a second subtask that uses the URL and the document_summarizer tool is needed to answer the query.\"""",
+    },
+    {
+        "query": "Did the revenue of Apple increase or decrease in the quarter compared to the the quarter last year?",
+        "example": """**Query:** "Did the revenue of Apple increase or decrease in the quarter compared to the the quarter last year?"
+**Context:** "Apple's revenue for Q3 2023 was $81.8 billion, compared to $83.4 billion in Q3 2022."
+* **subgoals:** []
+* **reasoning** "The user query asks if Apple's revenue increased or decreased for the quarters of two years, and there is context which provided the required numbers for comparison. This can be answered directly without any tool use.\"""",
+    },
+    {
+        "query": "Summarize the latest directors report from Apple",
+        "example": """**Query:** "Summarize the latest directors report from Apple"
+**Context:** null
+* **subgoals:** [
+    {"1": "Find the latest directors report for Apple", "depends_on": []},
+    {"2": "Read and summarize the latest directors report for Apple from the URL", "depends_on": ["1"]}
+]
+* **reasoning** "The user query asks to summarize a report without a URL provided, so this can be accompolished by breaking this into subtasks. First we can use the web_search tool to find the URL for the latest directors resport from Apple. Then a second subtask that uses the URL and the document_summarizer tool is needed to answer the query.\"""",
+    },
+    {
+        "query": "Calculate <metric> for <company> over <period>",
+        "example": """**Query:** "Calculate <metric> for <company> over <period>"
+**Context:** null
+* **subgoals:** [
+    {"1": "Find the financial information (either statement URL or directly) that contain information required to calculate this", "depends_on": []},
+    {"2": "Read and summarize the financial information required for the metric.", "depends_on": ["1"]},
+    {"3": "Calculate the <metric> based on the results of the previous tasks.", "depends_on": ["2"]}
+]
+* **reasoning** "The user query asks to calculate the <metric> for <company> over a period. This requires a breakdown into three tasks, starting with finding the financial information required to calculate the <metric> for the <company> using the web_search tool. The second task involved reading the information and summarizing it to get the information required to calculate the <metric> using the document_summarizer tool. To complete the query, use the calculator tool along with the obtained informtaion to calculate the <metric>\"""",
+    },
+    {
+        "query": "Find the revenue for <company 1> and <company 2> in the last quarter",
+        "example": """**Query:** "Find the revenue for <company 1> and <company 2> in the last quarter"
+**Context:** null
+* **subgoals:** [
+    {"1": "Find the revenue for <company 1> in the last quarter", "depends_on": []},
+    {"2": "Find the revenue for <company 2> in the last quarter", "depends_on": []}
+]
+* **reasoning** "The user query asks to find revenue in the last quarter for <company 1> and <company 2>. To get the best results possible, break down this query into two steps. In step 1 search for revenue for <company 1> using the web_search tool. In step 2 search for revenue for <company 2> using the web_search tool. The query is broken down into two separate searches to focus the search better, and give more relevant and accurate results.\"""",
+    },
+]
 
-    Break down the query into a series of steps that can be executed by these tools. Each subgoal should be clear, concise, and directly related to the original query and can be acted upon by one of the available tools. Each subgoal should be as small as possible to allow more accurate results, such as using the web_search to search about a single entity at a time. Also, ensure that the subgoals are ordered logically, where each subgoal builds upon the previous ones if necessary. If a subgoal depends on the output of a previous subgoal, ensure that is clearly indicated. The current date is {date} in 'YYYY-MM-DD' format, for reference.
 
-    **Examples:**
+@lru_cache(maxsize=1)
+def _example_selector(k: int):
+    """Build the semantic exemplar selector once, on first use.
 
-    **Example 1:**
-    **Query:** "What are the latest news regarding Tesla's recent product announcements?"
-    **Context:** null
-    * **subgoals:** [
-     {{"1": "Find the latest news regarding Tesla's recent product announcements.",
-     "depends_on": []}}]
-    * **reasoning:** "The user query asks for the 'latest' news which can be obtained using the web_search tool. There is no further task required to complete this query"
+    Imports are deferred so this prompt module stays import-light; the
+    nine example embeddings are computed a single time per process.
+    """
+    from langchain_core.example_selectors import SemanticSimilarityExampleSelector
+    from langchain_community.vectorstores import FAISS
+    from langchain_openai import OpenAIEmbeddings
+    return SemanticSimilarityExampleSelector.from_examples(
+        PLANNER_EXAMPLES, OpenAIEmbeddings(), FAISS, k=k, input_keys=["query"]
+    )
 
-    **Example 2:**
-    **Query:** "Calculate the Net Present Value (NPV) of a project with an initial investment of $100,000, expected cash flows of $30,000, $40,000, $50,000 over the next three years, and a discount rate of 10%."
-    **Context:** null
-    * **subgoals:** [
-     {{"1": "Calculate the Net Present Value (NPV) of a project with an initial investment of $100,000, expected cash flows of $30,000, $40,000, $50,000 over the next three years, and a discount rate of 10%.",
-        "depends_on": []}}]
-    * **reasoning:** "The user query asks for the 'calcualtion' of a financial metric and provides all the needed information to perform the calcualtion. This can be done by a single task using the calculator tool."
 
-    **Example 3:**
-    **Query:** "Plot the stock performance of Apple (AAPL) and Microsoft (MSFT) over the last year and show their relative growth."
-    **Context:** null
-    * **subgoals:** [
-     {{"1": "Retrieve historical stock data for Apple (AAPL) and Microsoft (MSFT) over the last year.", "depends_on": []}},
-     {{"2": "Plot a graph to show the growth of each company on the same plot for comaprison", "depends_on": ["1"]}}
-    * **reasoning:** "The user query asks to plot the performance of Apple and Microsoft over the last year and show their growth. This can be solved by breaking down the query into two tasks. First we need to obtain the historical data for both companies, which can be accompolished using the web_search tool. After the historical data is obtained, the graph can be plotted using the code_executor tool."
+def select_planner_examples(query: str, k: int = 3) -> str:
+    """Render the k examples semantically closest to the query.
 
-    **Example 4:**
-    **Query:** "Summarize the key financial highlights from the earnings report located at https://example.com/apple_q4_2023_earnings.pdf."
-    **Context:** null
-    * **subgoals:** [
-     {{"1": "Summarize the key financial highlights from the earnings report located at https://example.com/apple_q4_2023_earnings.pdf.",
-        "depends_on": []}}]
-    * **reasoning:** "The user query asks to summarize a report with a URL provided, so this can be accompolished using document_summarizer tool."
+    Sending 3 on-topic examples instead of all 9 cuts the volatile part of
+    the planning prompt by roughly two thirds; the static tool/instruction
+    prefix above them stays cacheable.
+    """
+    selected = _example_selector(k).select_examples({"query": query})
+    return "\n\n".join(
+        f"**Example {i}:**\n{example['example']}"
+        for i, example in enumerate(selected, start=1)
+    )
 
-    **Example 5:**
-    **Query:** "Find and summarize the Q1 2024 earnings report for Google."
-    **Context:** null
-    * **subgoals:** [
-     {{"1": "Find the Q1 2024 earnings report for Google.",
-        "depends_on": []}},
-     {{"2": "Summarize the key financial highlights from the Q1 2024 earnings report for Google.",
-        "depends_on": ["1"]}}
-    ]
-    * **reasoning:** "The user query asks to summarize a report without a URL provided, so this can be accompolished by breaking this into subtasks. First we can use the web_search tool to find the URL for the Q1 2024 earnings report for Google. Then a second subtask that uses the URL and the document_summarizer tool is needed to answer the query."
-     
-    **Example 6:**
-    **Query:** "Did the revenue of Apple increase or decrease in the quarter compared to the the quarter last year?"
-    **Context:** "Apple's revenue for Q3 2023 was $81.8 billion, compared to $83.4 billion in Q3 2022."
-    * **subgoals:** []
-    * **reasoning** "The user query asks if Apple's revenue increased or decreased for the quarters of two years, and there is context which provided the required numbers for comparison. This can be answered directly without any tool use."
-     
-    **Example 7**
-    **Query:** "Summarize the latest directors report from Apple"
-    **Context:** null
-    * **subgoals:** [
-        {{"1": "Find the latest directors report for Apple", "depends_on": []}},
-        {{"2": "Read and summarize the latest directors report for Apple from the URL", "depends_on": ["1"]}}
-    ]
-    * **reasoning** "The user query asks to summarize a report without a URL provided, so this can be accompolished by breaking this into subtasks. First we can use the web_search tool to find the URL for the latest directors resport from Apple. Then a second subtask that uses the URL and the document_summarizer tool is needed to answer the query."
-     
-    **Example 8**
-    **Query:** "Calculate <metric> for <company> over <period>"
-    **Context:** null
-    * **subgoals:** [
-        {{"1": "Find the financial information (either statement URL or directly) that contain information required to calculate this", "depends_on": []}},
-        {{"2": "Read and summarize the financial information required for the metric.", "depends_on": ["1"]}},
-        {{"3": "Calculate the <metric> based on the results of the previous tasks.", "depends_on": ["2"]}}
-    ]
-    * **reasoning** "The user query asks to calculate the <metric> for <company> over a period. This requires a breakdown into three tasks, starting with finding the financial information required to calculate the <metric> for the <company> using the web_search tool. The second task involved reading the information and summarizing it to get the information required to calculate the <metric> using the document_summarizer tool. To complete the query, use the calculator tool along with the obtained informtaion to calculate the <metric>"
-     
-    **Example 9**
-    **Query:** "Find the revenue for <company 1> and <company 2> in the last quarter"
-    **Context:** null
-    * **subgoals:** [
-        {{"1": "Find the revenue for <company 1> in the last quarter", "depends_on": []}},
-        {{"2": "Find the revenue for <company 2> in the last quarter", "depends_on": []}}
-    ]
-    * **reasoning** "The user query asks to find revenue in the last quarter for <company 1> and <company 2>. To get the best results possible, break down this query into two steps. In step 1 search for revenue for <company 1> using the web_search tool. In step 2 search for revenue for <company 2> using the web_search tool. The query is broken down into two separate searches to focus the search better, and give more relevant and accurate results."
-     
-    Context is provided to help the planner understand the if there is any information from the chat history that can be used to answer the query directly, or if it needs to be broken down into subgoals. If the context is sufficient to answer the query, no subgoals are needed. An empty list of subgoals should be returned in this case. If the query can not be broken down into subgoals, return null for subgoals.
-     
-    Think step-by-step when breaking down the task into subgoals based on the query, context and tool information provided. Provide reasoning for the break down that is well thought.
-     
-    Context: {context}
-    """),
+TASK_PLANNING_PROMPT = ChatPromptTemplate.from_messages([
+    # Frozen message: the body lives on disk and is spliced with the shared
+    # tool catalog once at import. str.replace rather than str.format so no
+    # stray braces in the prompt text ever need escaping.
+    SystemMessage(content=load_prompt("task_planning_system.md").replace("{catalog}", TOOL_CATALOG_BLOCK)),
+    # Volatile fields live in their own trailing system messages so the
+    # instruction/tool block above stays a byte-identical prefix across
+    # requests, which is what provider-side prompt caching keys on (OpenAI
+    # caches prefixes >= 1024 tokens automatically). The examples slot is
+    # filled by select_planner_examples with the k exemplars closest to
+    # the query.
+    ("system", "**Examples:**\n\n{examples}"),
+    ("system", "The current date is {date} in 'YYYY-MM-DD' format, for reference.\nContext: {context}"),
     ("user", "{query}")
 ])
+# Pin the variables so LangChain doesn't rescan the multi-KB system message
+# to re-infer them on every render
+TASK_PLANNING_PROMPT.input_variables = ["context", "date", "examples", "query"]
 
 
 TASK_REVIEW_PROMPT = ChatPromptTemplate.from_messages([
-    ("system", """You are a financial analysis task reviewer. Review the output produced by the tool for the subgoal. The output provided will be the actual output if its textual, but if its a visualization plot, the output provided will be the code. When reviewing code, take into account the fact that a Python REPL is used to execute the code and therefore the code should only have syntactically correct and executable statements. Provide feedback on the completeness and correctness of the subgoal based on the tool being used and the available context as a source of truth, and determine if the goal should be considered complete or if it should be retried with a modified input. The current date is {date} in 'YYYY-MM-DD' format, for reference.
-    Consider the following criteria:
-    1. **Completeness:** Does the output fully address the subgoal? Is it actionable and relevant to the original query?
-    2. **Correctness:** Is the output accurate and free from errors? Does it follow the expected format or logic? Is the output traceable to the context provided?
-    3. **Retry Logic:** If the output is not complete or correct, provide a modified input that addresses the issues identified in the output.
-    4. **Final Decision:** Indicate whether the subgoal is complete or needs to be retried.
-    5. **New Input:** If the subgoal needs to be retried, provide the modified input that should be used for the next attempt.
-    
-    **Examples:**
-    
-    **Example 1:**
-    * **Subgoal:** "Find the latest news regarding Tesla's recent product announcements."
-    * **Tool:** web_search
-    * **Input:** "What are the latest news regarding Tesla's recent product announcements?"
-    * **Output:** "Tesla announces new product line in Q3 2023."
-    * **Review:** "This subgoal is complete. The output provides the latest news regarding Tesla's product announcements, which is actionable and relevant to the original query."
-    * **Complete** True
-    * **Retry:** False
-    * **New Input:** null
-    * **is_url:** False
-    
-    **Example 2:**
-    * **Subgoal:** "Calculate the Net Present Value (NPV) of a project with an initial investment of $100,000, expected cash flows of $30,000, $40,000, $50,000 over the next three years, and a discount rate of 10%."
-    * **Tool:** calculator
-    * **Input:** "initial_investment = 100000; cash_flows = [30000, 40000, 50000]; discount_rate = 0.10; npv = initial_investment - sum([cf/((1+discount_rate)^t) for t, cf in enumerate(cash_flows)]); print(npv);"
-    * **Output:** "The NPV of the project is $12,000."
-    * **Review:** "This subgoal is complete. The output provides the calculated NPV, which is actionable and directly addresses the original query."
-    * **Complete** True
-    * **Retry:** False
-    * **New Input:** null
-    * **is_url:** False
-     
-    # Show a third example to illustrate what the output should look like when the subgoal is not complete or needs to be retried because of an error in the input causing the tool to not return a valid output.
-    **Example 3:**
-    * **Subgoal:** "Plot the stock performance of Apple (AAPL) and Microsoft (MSFT) over the last year and show their relative growth."
-    * **Tool:** code_executor
-    * **Input:** "import yfinance as yf; import matplotlib.pyplot as plt; # Data for revenue growth over the last 2 quarters; data_aapl = yf.download('AAPL', period='1y')['Close']; data_msft = yf.download('MSFT', period='1y')['Close']; plt.figure(figsize=(10, 6)); plt.plot(data_aapl.index, data_aapl / data_aapl.iloc * 100, label='AAPL (Normalized)'); plt.plot(data_msft.index, data_msft / data_msft.iloc * 100, label='MSFT (Normalized)'); plt.title('Normalized Stock Performance (Last 1 Year)'); plt.xlabel('Date'); plt.ylabel('Normalized Price (%)'); plt.legend(); plt.grid(True);"
-    * **Output:** "<output_graph>"
-    * **Review:** "This subgoal is not complete. The code contains a comment as the third statement - "# Data for revenue growth over the last 2 quarters;". By introducing a comment, the statements following it are all commented. Additionally, at the end of the output, the code should include plt.show() to display the plot. All code must be comment free to be executable correctly."
-    * **Complete** False
-    * **Retry:** True
-    * **New Input:** "import yfinance as yf; import matplotlib.pyplot as plt; data_aapl = yf.download('AAPL', period='1y')['Close']; data_msft = yf.download('MSFT', period='1y')['Close']; plt.figure(figsize=(10, 6)); plt.plot(data_aapl.index, data_aapl / data_aapl.iloc * 100, label='AAPL (Normalized)'); plt.plot(data_msft.index, data_msft / data_msft.iloc * 100, label='MSFT (Normalized)'); plt.title('Normalized Stock Performance (Last 1 Year)'); plt.xlabel('Date'); plt.ylabel('Normalized Price (%)'); plt.legend(); plt.grid(True); plt.show();"
-    * **is_url:** False
-     
-    Ensure the new input is well-formed and can be processed by the tool. Refer to the previous input to the tool to understand the format and requirements. Only provide feedback and comments in the review/feedback section.
-    """),
+    SystemMessage(content=load_prompt("task_review_system.md")),
+    # Keep the date out of the static block above so it stays a stable,
+    # provider-cacheable prefix
+    ("system", "The current date is {date} in 'YYYY-MM-DD' format, for reference."),
     ("user", "Review the output produced by the tool - {tool} - for the subgoal: {subgoal}. The output is: {result}. Please provide feedback on the completeness and correctness of the subgoals, as well as if the goal should be considered complete or if it should be retried by providing the modified input when the current input was - {query}.")
-])
\ No newline at end of file
+])
+TASK_REVIEW_PROMPT.input_variables = ["date", "query", "result", "subgoal", "tool"]
+
+
+# Row-marshalled variant: several subgoals packed into one request, which
+# trades slightly longer single-call latency for eliminating per-subgoal
+# round-trips on rate-limited endpoints. Shares the single-review system
+# message so both prompts present identical criteria.
+TASK_REVIEW_BATCH_PROMPT = ChatPromptTemplate.from_messages([
+    *TASK_REVIEW_PROMPT.messages[:2],
+    ("user", "Review the outputs produced for the following {count} subgoals. Apply the review criteria to each numbered subgoal independently and return exactly {count} reviews, one per subgoal, in the same order.\n\n{entries}")
+])
+TASK_REVIEW_BATCH_PROMPT.input_variables = ["count", "date", "entries"]
\ No newline at end of file
@@ -1,64 +1,19 @@
 """Prompts for the ToolRouter component."""
 
 from langchain.prompts import ChatPromptTemplate
+from langchain_core.messages import SystemMessage
+from app.prompts._loader import load_prompt
+from app.prompts._tools_catalog import TOOL_CATALOG_BLOCK
 
 TOOL_ROUTING_PROMPT = ChatPromptTemplate.from_messages([
-    ("system", """You are an expert tool router for an autonomous financial intelligence agent. Your primary responsibility is to analyze the current subgoal and precisely select the single most appropriate tool from the available options to achieve that subgoal. Think step-by-step to determine the best fit.
-
-    **Available Tools and Their Capabilities:**
-
-    1) web_search: Use this tool when the subgoal requires fetching real-time, up-to-date information from the internet. This includes breaking financial news, general market trends, recent regulatory updates, or finding the URLs for specific company reports, analyst articles, or economic indicators. It's for information not available in a structured database or requiring current events.
-    Keywords: "latest news", "current trends", "recent regulations", "find URL", "economic indicators".
-
-    2) calculator: Use this tool for precise mathematical operations, including basic arithmetic (addition, subtraction, multiplication, division), percentages, and specific financial calculations like Net Present Value (NPV), Return on Investment (ROI), debt-to-equity ratios, compound interest, or other quantitative financial metrics. It ensures numerical accuracy for any query involving calculations.
-    Keywords: "calculate", "what is the ROI", "NPV of", "percentage change", "determine the ratio".
-
-    3) code_executor: Use this tool when the subgoal involves executing Python code for advanced data analysis, manipulation, or visualization. This is ideal for retrieving historical stock data (e.g., using 'yfinance'), performing complex statistical analysis with 'pandas', generating charts (e.g., stock price trends, correlations) with 'matplotlib' or 'plotly', or running custom financial models.
-    Keywords: "plot", "visualize", "compare stock performance", "analyze data", "run a model", "historical data", "correlation".
-
-    4) document_summarizer Use this tool when the subgoal requires processing and summarizing the content of a specific document or URL. This is ideal for lengthy financial reports (e.g., quarterly earnings, 10-K/10-Q filings), analyst research papers, or detailed articles where key insights, financial highlights, or specific figures need to be extracted and condensed. This tool can also handle obtaining reports via web scraping or API integrations if a direct URL or file is provided. A valid URL must be provided as the query along with the is_url flag being set to True, so the query can be used directly to fetch the content located at the URL. Extra text in the query field will cause the request to fail as only a URL is expected.
-    Keywords: "summarize report", "extract highlights from", "condense document", "key takeaways from URL", "analyze filing".
-
-    Selection Logic:
-    Prioritize tools based on the direct action required by the subgoal. If a subgoal requires finding information *before* it can be processed, use 'web_search' first. If it's a direct calculation, use 'calculator'. If it's data analysis or visualization, use 'code_executor'. If it's about condensing text from a source, use 'document_summarizer'.
-
-    ---
-    **Examples:**
-
-    **Example 1:**
-    **Subgoal:** "Find the latest news regarding Tesla's recent product announcements."
-    **Thought:** The subgoal explicitly asks for "latest news" and "recent product announcements," which are real-time, dynamic pieces of information. The 'web_search' tool is designed for fetching current information from the internet. The query is not just a URL so the is_url flag is also set to False.
-    tool: web_search
-    query="latest Tesla product announcements news"
-    is_url=False
-
-    **Example 2:**
-    **Subgoal:** "Calculate the Net Present Value (NPV) of a project with an initial investment of $100,000, expected cash flows of $30,000, $40,000, $50,000 over the next three years, and a discount rate of 10%."
-    **Thought:** The subgoal clearly states "Calculate the Net Present Value" and provides all necessary numerical inputs. This is a precise mathematical and financial calculation. The 'calculator' tool is specifically for performing such computations accurately. The tool uses a Python REPL to execute the calculation, therefore, the query should be structured to work in the REPL environment and the final answer that is required as a result should be printed. The calcualtor uses a Python REPL so no comments will be added to allow the code to be executed properly.
-    tool: calculator
-    query="initial_investment = 100000; cash_flows = [30000, 40000, 50000]; discount_rate = 0.10; npv = initial_investment - sum([cf/((1+discount_rate)**t) for t, cf in enumerate(cash_flows)]); print(npv);"
-    is_url=False
-
-    **Example 3:**
-    **Subgoal:** "Plot the stock performance of Apple (AAPL) and Microsoft (MSFT) over the last year and show their relative growth."
-    **Thought:** The subgoal requires retrieving "stock performance" data and then "plotting" it to "show relative growth." This involves fetching time-series data and generating a visual representation, which are capabilities of the `code_executor` tool using financial libraries and plotting tools. The code executor uses a Python REPL so no comments will be added to allow the code to be executed properly.
-    tool: code_executor
-    query="import yfinance as yf; import matplotlib.pyplot as plt; data_aapl = yf.download('AAPL', period='1y')['Close']; data_msft = yf.download('MSFT', period='1y')['Close']; plt.figure(figsize=(10, 6)); plt.plot(data_aapl.index, data_aapl / data_aapl.iloc * 100, label='AAPL (Normalized)'); plt.plot(data_msft.index, data_msft / data_msft.iloc * 100, label='MSFT (Normalized)'); plt.title('Normalized Stock Performance (Last 1 Year)'); plt.xlabel('Date'); plt.ylabel('Normalized Price (%)'); plt.legend(); plt.grid(True); plt.show();"
-    is_url=False
-
-    **Example 4:**
-    **Subgoal:** "Summarize the key financial highlights from the earnings report located at https://example.com/apple_q4_2023_earnings.pdf."
-    **Thought:** The subgoal explicitly asks to "summarize" a "report" from a provided "URL" in the query and specifically requests "key financial highlights." The document_summarizer' tool is designed for processing and extracting insights from documents, including those at URLs.
-    tool: document_summarizer
-    query="https://example.com/apple_q4_2023_earnings.pdf"
-    is_url=True
-
-    **Example 5:**
-    **Subgoal:** "Find the Q1 2024 earnings report for Google."
-    **Thought:** The subgoal directly asks to "find" the Q1 2024 earnings report for Google. I need to "find" the report, which means locating its URL on the web. This requires the 'web_search' tool.
-    tool: web_search
-    query="Q1 2024 earnings report for Google"
-    is_url=False
-    """),
+    # Frozen message: the body lives on disk and is spliced with the shared
+    # tool catalog once at import
+    SystemMessage(content=load_prompt("tool_routing_system.md").replace("{catalog}", TOOL_CATALOG_BLOCK)),
+    # The system message above is fully static, so it already forms the
+    # byte-identical prefix provider-side prompt caching keys on; keep any
+    # new variables in the human turn below
     ("human", "Available tools: {tools}\nSubgoal: {subgoal}\nSelect the most appropriate tool name from the available tools.")
-])
\ No newline at end of file
+])
+# Pin the variables so LangChain doesn't rescan the multi-KB system message
+# to re-infer them on every render
+TOOL_ROUTING_PROMPT.input_variables = ["subgoal", "tools"]
\ No newline at end of file
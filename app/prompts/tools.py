@@ -1,43 +1,41 @@
 """Prompts for tools."""
 
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.messages import SystemMessage
+from app.prompts._loader import load_prompt
 
 DOCUMENT_SUMMARIZER_PROMPT = ChatPromptTemplate.from_messages([
-    ("system", """You are a document summarizer for an autonomous financial intelligence agent. Your task is to process and summarize the content of a specific document or URL, extracting key insights, financial highlights, or specific figures. This is ideal for lengthy financial reports (e.g., quarterly earnings, 10-K/10-Q filings), analyst research papers, or detailed articles where key insights need to be condensed.
-    """),
+    # Frozen message: no variables, so skip template parsing on every render
+    SystemMessage(content=load_prompt("document_summarizer_system.md")),
     ("human", "Content: {content}")
 ])
+DOCUMENT_SUMMARIZER_PROMPT.input_variables = ["content"]
+
+# Row-marshalled variant: several documents packed into one request so a
+# K-document workload pays one network round-trip instead of K. Shares the
+# frozen summarizer system message so both prompts present identical
+# instructions.
+DOCUMENT_SUMMARIZER_BATCH_PROMPT = ChatPromptTemplate.from_messages([
+    DOCUMENT_SUMMARIZER_PROMPT.messages[0],
+    ("human", "Summarize each of the following {count} documents independently. Return exactly {count} summaries, one per document, in the same order.\n\n{entries}")
+])
+DOCUMENT_SUMMARIZER_BATCH_PROMPT.input_variables = ["count", "entries"]
 
 WEB_SEARCH_PROMPT = ChatPromptTemplate.from_messages([
-    ("system", """You are a helpful reaserch assistant, you will be given a query and the results of a web search and crawl based on that query. You need to summarize the results of the web search and crawl to retain only the relevant information based on the query. Always retain details about facts, financial figures and information, and URLs which can be used for later reference. The date today is {today}. The results obtained were through the web search and web crawl are: {results}"""),
+    # Frozen message: no variables, so skip template parsing on every render
+    SystemMessage(content=load_prompt("web_search_system.md")),
+    # Volatile fields trail the static instructions so the prefix above stays
+    # byte-identical across calls for provider-side prompt caching
+    ("system", "The date today is {today}. The results obtained were through the web search and web crawl are: {results}"),
     ("human", "{query}")
 ])
+WEB_SEARCH_PROMPT.input_variables = ["query", "results", "today"]
 
+# Compact spec: the sanitizer runs per code execution (now only as the
+# fallback for unparseable snippets), so its prompt is kept to a minimum —
+# every extra token here is paid on each call
 CODE_SANITIZER_PROMPT = ChatPromptTemplate.from_messages([
-    ("system", """You are a Python code sanitizer. Your task is to take a given Python code snippet and remove all comments, empty lines, and any non-executable statements, leaving only valid, executable Python code on a single line, with statements separated by semicolons.
-
-    The output must be a single string containing only Python code, formatted as:
-    statement1; statement2; statement3; ...
-
-    **Constraints:**
-    - Remove all single-line comments (starting with '#').
-    - Remove all multi-line comments (enclosed in "'''" or \"\"\").
-    - Remove all empty lines.
-    - Ensure all remaining code statements are on a single line, separated by a semicolon (';').
-    - Do not add any new lines or extra characters.
-    - Preserve the original order of executable code statements.
-
-    **Example Input:**
-    # This is a comment
-    import pandas as pd # Import pandas library
-
-    data = {{'col1': [1, 2], 'col2': [3, 4]}} # Sample data
-    df = pd.DataFrame(data)
-
-    # Another comment here
-    print(df.head())
-
-    **Example Output:**
-    import pandas as pd; data = {{'col1': [1, 2], 'col2': [3, 4]}}; df = pd.DataFrame(data); print(df.head())"""),
+    SystemMessage(content=load_prompt("code_sanitizer_system.md")),
     ("human", "Code: {code}")
-])
\ No newline at end of file
+])
+CODE_SANITIZER_PROMPT.input_variables = ["code"]
\ No newline at end of file
@@ -2,22 +2,64 @@ from langchain.tools.base import BaseTool
 from langchain_tavily import TavilySearch, TavilyCrawl
 from langchain_experimental.utilities import PythonREPL
 from langchain_openai import ChatOpenAI
-from typing import Dict, Any
+from typing import Dict, Any, ClassVar, List, Optional
+import ast
+import asyncio
+import re
 import requests
-from bs4 import BeautifulSoup
+from selectolax.parser import HTMLParser
 import io
 import base64
+import orjson
+import matplotlib
+# Headless raster backend: skips GUI backend init and is safe to use from
+# worker threads
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 from pydantic import Field, BaseModel
-from PyPDF2 import PdfReader
+import pypdfium2 as pdfium
 import logging
 from app.utils.logging import setup_logger, log_function_call, log_function_result, log_error
-from app.prompts.tools import DOCUMENT_SUMMARIZER_PROMPT, WEB_SEARCH_PROMPT, CODE_SANITIZER_PROMPT
+from app.prompts.tools import DOCUMENT_SUMMARIZER_PROMPT, DOCUMENT_SUMMARIZER_BATCH_PROMPT, WEB_SEARCH_PROMPT, CODE_SANITIZER_PROMPT
+from app.tools.sanitize import sanitize
+from app.tools import crawl_cache, summary_cache
+from app.utils.models import MODEL_TIERS
 from datetime import datetime
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from urllib.parse import urlparse
 
 # Set up logger for this module
 logger = setup_logger(__name__)
 
+# Crawls are network-bound, so fanning them out over a small shared pool
+# collapses the per-search wall time from the sum of the per-URL latencies
+# to roughly the slowest one. max_workers doubles as the concurrency bound
+# on outbound Tavily requests.
+_CRAWL_POOL = ThreadPoolExecutor(max_workers=5, thread_name_prefix="crawl")
+
+# Shared session so repeated document fetches reuse pooled keep-alive
+# connections, skipping the TCP + TLS handshake on every fetch after the
+# first to a host. The adapter pool is sized for the crawl fan-out so
+# concurrent workers don't evict each other's connections.
+_HTTP_SESSION = requests.Session()
+_HTTP_SESSION.headers.update({
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+})
+_HTTP_SESSION.mount('https://', requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=32))
+_HTTP_SESSION.mount('http://', requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=32))
+
+# Cap how long a single document fetch may stall the agent
+_FETCH_TIMEOUT_SECONDS = 30
+
+# Results whose search snippet is already this long carry enough content to
+# summarize without a follow-up crawl
+_CRAWL_SNIPPET_THRESHOLD = 500
+
+# At most this many URLs are crawled per search
+_CRAWL_LIMIT = 3
+
 class WebSearchTool(BaseTool):
     """Searches for real-time financial information, news, and market data"""
     
@@ -26,6 +68,7 @@ class WebSearchTool(BaseTool):
     search_tool: TavilySearch = Field(default=None)
     crawl_tool: TavilyCrawl = Field(default=None)
     llm: ChatOpenAI = Field(default=None)
+    chain: Any = Field(default=None)  # Placeholder for the summarization chain
     logger: logging.Logger = Field(default_factory=lambda: setup_logger(f"{__name__}.WebSearchTool"))
 
     def __init__(self):
@@ -41,8 +84,8 @@ class WebSearchTool(BaseTool):
             max_pages=5,
             timeout=30
         )
-        self.llm = ChatOpenAI(temperature=0)
-        self.logger = setup_logger(f"{__name__}.WebSearchTool")
+        self.llm = _shared_llm()
+        self.chain = WEB_SEARCH_PROMPT | self.llm
 
     def _format_results(self, results: dict) -> str:
         """Format the search results into a readable string."""
@@ -58,6 +101,32 @@ class WebSearchTool(BaseTool):
         
         return "\n".join(formatted) if formatted else str(results)
 
+    @staticmethod
+    def _select_urls_to_crawl(search_results: list) -> List[str]:
+        """Pick which result URLs are worth a follow-up crawl.
+
+        Results whose snippet already carries enough content are used
+        as-is, only one URL per host is crawled (the ranker often surfaces
+        several pages from the same site), and the fan-out is capped so a
+        search never pays more than a few full-page round-trips.
+        """
+        seen_hosts = set()
+        to_crawl = []
+        for result in search_results:
+            url = result.get('url') if isinstance(result, dict) else None
+            if not url:
+                continue
+            if len(result.get('content', '')) >= _CRAWL_SNIPPET_THRESHOLD:
+                continue
+            host = urlparse(url).netloc
+            if host in seen_hosts:
+                continue
+            seen_hosts.add(host)
+            to_crawl.append(url)
+            if len(to_crawl) >= _CRAWL_LIMIT:
+                break
+        return to_crawl
+
     def _run(self, query: str) -> str:
         """Execute the web search with the given query."""
         # log_function_call(self.logger, "_run", query=query)
@@ -72,28 +141,43 @@ class WebSearchTool(BaseTool):
             
             # If we got search results, crawl the first few URLs for more detailed information
             if search_results and isinstance(search_results, list):
-                urls_to_crawl = [r['url'] for r in search_results if 'url' in r]
+                urls_to_crawl = self._select_urls_to_crawl(search_results)
                 detailed_results = []
-                
+
+                # Recently crawled pages come straight from the disk cache;
+                # only the rest pay an HTTP round-trip
+                uncached = []
                 for url in urls_to_crawl:
+                    cached = crawl_cache.get_crawl(url)
+                    if cached is not None:
+                        detailed_results.append(cached)
+                    else:
+                        uncached.append(url)
+
+                # Submit every crawl up front, then collect in submission
+                # order so the combined results stay deterministic
+                if uncached:
+                    self.logger.info(f"Crawling {len(uncached)} URLs concurrently")
+                futures = [(url, _CRAWL_POOL.submit(self.crawl_tool.invoke, url)) for url in uncached]
+                for url, future in futures:
                     try:
-                        self.logger.info(f"Crawling URL: {url}")
-                        crawl_result = self.crawl_tool.invoke(url)
+                        crawl_result = future.result()
                         if crawl_result:
                             detailed_results.append(crawl_result)
+                            crawl_cache.put_crawl(url, crawl_result)
                     except Exception as e:
                         self.logger.warning(f"Failed to crawl {url}: {str(e)}")
                         continue
-                
+
                 # Combine and format all results
                 formatted_results = self._format_results(search_results + detailed_results)
             else:
                 formatted_results = self._format_results(search_results)
 
-            formatted_results = (WEB_SEARCH_PROMPT | self.llm).invoke({"query": query, "results": formatted_results, "today": curr_date})
+            formatted_results = self.chain.invoke({"query": query, "results": formatted_results, "today": curr_date})
             
             # log_function_result(self.logger, "_run", formatted_results.content)
-            self.logger.debug(f"Result of Web Search and Summarization:\n\n{formatted_results.content}")
+            self.logger.debug("Result of Web Search and Summarization:\n\n%s", formatted_results.content)
             return {
                 "type": "text",
                 "query": query,
@@ -107,21 +191,36 @@ class WebSearchTool(BaseTool):
         
 class SanitizedCodeSchema(BaseModel):
     code: str = Field(description="Sanitized code that can be run in a Python REPL tool. Each statement should end with ';'. The code should only contain code statements.")
-        
+
+@lru_cache(maxsize=1)
+def _sanitizer_chain():
+    llm = _shared_llm(MODEL_TIERS["sanitizer"]).with_structured_output(SanitizedCodeSchema, method='json_schema', strict=True)
+    return CODE_SANITIZER_PROMPT | llm
+
+@lru_cache(maxsize=1024)
+def _llm_sanitize(code: str) -> str:
+    """Memoized LLM sanitation fallback.
+
+    Reviewer retries frequently resubmit the same snippet, so identical
+    inputs short-circuit to the previous answer instead of paying the
+    call again. Sanitation is deterministic (temperature=0), making the
+    memo safe; lru_cache keys the interned string directly, which is
+    equivalent to hashing the content.
+    """
+    return _sanitizer_chain().invoke({"code": code}).model_dump()['code']
+
+
 class CodeExecutorTool(BaseTool):
     """Executes Python code for financial analysis and visualization"""
     
     name: str = "code_executor"
     description: str = "Executes Python code for financial analysis and visualization"
     python_repl: PythonREPL = Field(default_factory=PythonREPL)
-    llm: ChatOpenAI = Field(default=None)
     logger: logging.Logger = Field(default_factory=lambda: setup_logger(f"{__name__}.CodeExecutorTool"))
 
     def __init__(self):
         super().__init__()
         self.python_repl = PythonREPL()
-        self.llm = ChatOpenAI(model="gpt-4.1", temperature=0).with_structured_output(SanitizedCodeSchema, method='json_schema', strict=True)
-        self.logger = setup_logger(f"{__name__}.CodeExecutorTool")
 
     def _run(self, code: str) -> Dict[str, Any]:
         """Execute Python code and return results."""
@@ -130,19 +229,30 @@ class CodeExecutorTool(BaseTool):
         try:
             # Execute the code
             self.logger.info("Sanitizing code and executing in REPL")
-            sanitized_code = (CODE_SANITIZER_PROMPT | self.llm).invoke({"code": code}).model_dump()
-            # self.logger.debug(f"Sanitized code: {sanitized_code}")
-            result = self.python_repl.run(sanitized_code['code'])
+            try:
+                # AST round-trip handles the common case locally in ~1ms;
+                # the LLM sanitizer is only consulted for snippets the
+                # parser and tokenizer both reject
+                sanitized_code = sanitize(code)
+            except SyntaxError:
+                self.logger.debug("Local sanitation failed, falling back to LLM sanitizer")
+                sanitized_code = _llm_sanitize(code)
+            result = self.python_repl.run(sanitized_code)
             
             # Check if the result contains a plot
-            if "plt" in sanitized_code['code']:
+            if "plt" in sanitized_code:
                 self.logger.debug("Detected matplotlib plot in code")
-                # Handle matplotlib plots
+                # Handle matplotlib plots: encode the specific current
+                # figure at a web-friendly DPI rather than whatever the
+                # implicit global state happens to be
+                fig = plt.gcf()
                 buffer = io.BytesIO()
-                plt.savefig(buffer, format='png')
-                plt.close()
-                buffer.seek(0)
-                image = base64.b64encode(buffer.read()).decode()
+                fig.savefig(buffer, format='png', dpi=90)
+                plt.close(fig)
+                # getbuffer() exposes the PNG bytes without copying them
+                # out of the BytesIO first, so the only allocations are
+                # the base64 bytes and the final str
+                image = base64.b64encode(buffer.getbuffer()).decode('ascii')
                   # Create HTML/Markdown for displaying the image
                 img_markdown = f"\n\n<img src='data:image/png;base64,{image}' class='img-fluid'>\n\n"
                 
@@ -155,21 +265,23 @@ class CodeExecutorTool(BaseTool):
                 # log_function_result(self.logger, "_run", "Generated matplotlib plot")
                 self.logger.info("Generated visualization using matplotlib")
                 
-            elif "go.Figure" in sanitized_code['code']:
+            elif "go.Figure" in sanitized_code:
                 self.logger.debug("Detected plotly figure in code")
-                # Handle plotly figures
-                import plotly.io as pio
-                # Get the last figure from plotly's figure factory
-                from plotly import fig_tracker
-                fig = fig_tracker.get_figure()
-                if fig:
-                    buffer = io.BytesIO()
-                    pio.write_image(fig, buffer, format='png')
-                    buffer.seek(0)
-                    image = base64.b64encode(buffer.read()).decode()
+                # Handle plotly figures. The REPL executes in-process, so
+                # the figure the code built is still reachable from its
+                # namespace; take the most recently assigned one.
+                import plotly.graph_objects as go
+                fig = None
+                for namespace in (self.python_repl.globals, self.python_repl.locals):
+                    if isinstance(namespace, dict):
+                        for value in namespace.values():
+                            if isinstance(value, go.Figure):
+                                fig = value
+                if fig is not None:
+                    image = base64.b64encode(fig.to_image(format='png', engine='kaleido')).decode()
                       # Create HTML/Markdown for displaying the image
                     img_markdown = f"\n\n<img src='data:image/png;base64,{image}' class='img-fluid'>\n\n"
-                    
+
                     response = {
                         "type": "plot",
                         "data": image,
@@ -177,16 +289,23 @@ class CodeExecutorTool(BaseTool):
                         "display": img_markdown
                     }
                     # log_function_result(self.logger, "_run", "Generated plotly plot")
-                self.logger.info("Generated visualization using plotly")
+                    self.logger.info("Generated visualization using plotly")
+                else:
+                    self.logger.warning("No plotly figure found in REPL namespace")
+                    response = {
+                        "type": "text",
+                        "result": result,
+                        "display": _display(result)
+                    }
 
             else:
                 response = {
                     "type": "text",
                     "result": result,
-                    "display": str(result)
+                    "display": _display(result)
                 }
 
-            response["query"] = sanitized_code['code']
+            response["query"] = sanitized_code
             # log_function_result(self.logger, "_run", response)
             return response
             
@@ -197,27 +316,79 @@ class CodeExecutorTool(BaseTool):
                 "error": str(e)
             }
         
+@lru_cache(maxsize=None)
+def _shared_llm(model: str = None, streaming: bool = False) -> ChatOpenAI:
+    """One chat client per (model, streaming) configuration.
+
+    The clients are stateless and thread-safe, so every tool instance can
+    share them instead of constructing its own connection pool.
+    """
+    kwargs = {"temperature": 0, "streaming": streaming}
+    if model is not None:
+        kwargs["model"] = model
+    return ChatOpenAI(**kwargs)
+
+def _display(result: Any) -> str:
+    """Render a REPL result for display.
+
+    Strings (captured stdout, the common case) pass through untouched;
+    structured results are serialized with orjson's C encoder — numpy
+    aware via OPT_SERIALIZE_NUMPY — instead of repr, which walks nested
+    containers in Python and degrades badly on large arrays.
+    """
+    if isinstance(result, str):
+        return result
+    try:
+        return orjson.dumps(result, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    except TypeError:
+        return str(result)
+
+# Pure-arithmetic inputs: digits, operators, parens, whitespace. Nothing
+# matching this can reference a name, so it is safe to evaluate directly
+# without the REPL or the sanitizer.
+_SAFE_MATH = re.compile(r'^[\d\s+\-*/().%]+$')
+
 class CalculatorTool(BaseTool):
     """Performs mathematical calculations like addition, subtraction, percentages etc."""
-    
+
     name: str = "calculator"
     description: str = "Performs mathematical calculations like addition, subtraction, percentages etc."
-    repl: CodeExecutorTool = Field(default_factory=lambda: CodeExecutorTool())
+    repl: CodeExecutorTool = Field(default=None)
     logger: logging.Logger = Field(default_factory=lambda: setup_logger(f"{__name__}.CalculatorTool"))
 
+    # One executor for all calculator instances: each CodeExecutorTool
+    # carries its own PythonREPL, so building two per calculator (the old
+    # default_factory plus the __init__ reassignment) was pure overhead
+    _shared_executor: ClassVar[Optional[CodeExecutorTool]] = None
+
     def __init__(self):
         super().__init__()
-        self.repl = CodeExecutorTool()
-        self.logger = setup_logger(f"{__name__}.CalculatorTool")
+        if CalculatorTool._shared_executor is None:
+            CalculatorTool._shared_executor = CodeExecutorTool()
+        self.repl = CalculatorTool._shared_executor
 
     def _run(self, query: str) -> Dict[str, float]:
         """Convert the user query that may be in natural language into a valid mathematical operation in Python, and use Python's eval to compute the result."""
         # log_function_call(self.logger, "_run", query=query)
         try:
-            # Convert the query into a valid Python expression
-            # self.logger.debug("Converting natural language to Python expression")
-            # self.logger.debug(f"Generated Python code: {query}")
-            
+            # Fast path: a bare arithmetic expression needs neither the
+            # sanitizer nor the REPL — evaluate the AST-compiled expression
+            # with builtins stripped and return immediately
+            expression = query.strip().rstrip(';')
+            if _SAFE_MATH.fullmatch(expression):
+                try:
+                    self.logger.info("Evaluating arithmetic expression directly")
+                    value = eval(compile(ast.parse(expression, mode='eval'), '<calc>', 'eval'), {"__builtins__": {}})
+                    return {
+                        "type": "text",
+                        "result": str(value),
+                        "query": query
+                    }
+                except (SyntaxError, ArithmeticError):
+                    # Not actually a single well-formed expression (or it
+                    # divides by zero) — let the REPL report it instead
+                    pass
+
             # Execute the Python code using the CodeExecutorTool
             # self.logger.debug("Executing generated code")
             self.logger.info("Performing calculation using calculator.")
@@ -238,19 +409,79 @@ class CalculatorTool(BaseTool):
                 "query": query
             }
 
+# Document extraction is CPU-bound, so payloads above this size are parsed
+# in a worker process instead of on the request thread; below it the
+# pickle + IPC overhead outweighs the parse cost. Workers start lazily on
+# first submit.
+_INLINE_EXTRACT_BYTES = 100 * 1024
+_CPU_POOL = ProcessPoolExecutor(max_workers=os.cpu_count())
+
+def _extract_text(mime_type: str, payload) -> str:
+    """Extract text from a PDF byte string or an HTML document string.
+
+    Top-level (picklable) so it can run in the extraction process pool.
+    """
+    if mime_type == 'application/pdf':
+        # PDFium extracts text in native code, which is an order of
+        # magnitude faster than PyPDF2's pure-Python parser on long
+        # filings; the bytes are handed over directly with no BytesIO copy
+        pdf = pdfium.PdfDocument(payload)
+        try:
+            return ' '.join(page.get_textpage().get_text_range() for page in pdf)
+        finally:
+            pdf.close()
+    # selectolax parses HTML in C (lexbor), which keeps multi-MB SEC pages
+    # well under the >1s BeautifulSoup html.parser cost; script/style
+    # bodies are dropped so only visible text reaches the summarizer
+    tree = HTMLParser(payload)
+    for tag in tree.css('script,style'):
+        tag.decompose()
+    root = tree.body or tree.root
+    return root.text(separator=' ', strip=True) if root is not None else ''
+
+# Documents above this token count get map-reduce summarization; the chunk
+# size keeps each map call well inside the model's context window
+_SUMMARY_TOKEN_LIMIT = 12_000
+_SUMMARY_CHUNK_TOKENS = 8_000
+
+@lru_cache(maxsize=1)
+def _token_encoder():
+    import tiktoken
+    try:
+        return tiktoken.encoding_for_model(MODEL_TIERS["summarizer"])
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+@lru_cache(maxsize=1)
+def _chunk_splitter():
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    return RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+        model_name=MODEL_TIERS["summarizer"],
+        chunk_size=_SUMMARY_CHUNK_TOKENS,
+        chunk_overlap=200,
+    )
+
+class BatchSummarySchema(BaseModel):
+    summaries: List[str] = Field(description="One summary per input document, in the same order as the documents were given.")
+
 class DocumentSummarizerTool(BaseTool):
     """Summarizes financial documents, reports, and articles"""
-    
+
     name: str = "document_summarizer"
     description: str = "Summarizes financial documents, reports, and articles"
-    llm: ChatOpenAI = Field(default_factory=lambda: ChatOpenAI(model="gpt-4o-mini", temperature=0))
+    llm: ChatOpenAI = Field(default_factory=lambda: _shared_llm(MODEL_TIERS["summarizer"], streaming=True))
     chain: Any = Field(default=None)  # Placeholder for the summarization chain
+    batch_chain: Any = Field(default=None)  # Placeholder for the row-marshalled chain
     logger: logging.Logger = Field(default_factory=lambda: setup_logger(f"{__name__}.DocumentSummarizerTool"))
 
+    # Documents per row-marshalled call; returns diminish past a handful of
+    # payloads per request while the prompt keeps growing
+    _BATCH_SUMMARY_SIZE = 5
+
     def __init__(self):
         super().__init__()
-        self.logger = setup_logger(f"{__name__}.DocumentSummarizerTool")
         self.chain = DOCUMENT_SUMMARIZER_PROMPT | self.llm
+        self.batch_chain = DOCUMENT_SUMMARIZER_BATCH_PROMPT | self.llm.with_structured_output(BatchSummarySchema, method='json_schema', strict=True)
 
     def _extract_text_from_response(self, response: requests.Response) -> str:
         """Extract text from different document types."""
@@ -261,19 +492,21 @@ class DocumentSummarizerTool(BaseTool):
 
         if mime_type == 'application/pdf':
             self.logger.info("Processing PDF document")
-            # Handle PDF files
-            pdf_file = io.BytesIO(response.content)
-            pdf_reader = PdfReader(pdf_file)
-            text = ' '.join(page.extract_text() for page in pdf_reader.pages)
-            # self.logger.debug(f"Extracted {len(pdf_reader.pages)} pages from PDF")
+            payload = response.content
         elif mime_type == 'text/html':
             self.logger.info("Processing HTML document")
-            # Handle HTML content
-            soup = BeautifulSoup(response.text, 'html.parser')
-            text = soup.get_text(separator=' ', strip=True)
+            payload = response.text
         else:
             # Handle plain text
-            text = response.text
+            return response.text
+
+        # Small payloads parse in microseconds, so the pickle + IPC cost of
+        # a worker process would dominate; large ones go to the process
+        # pool so concurrent extractions scale across cores
+        if len(payload) < _INLINE_EXTRACT_BYTES:
+            text = _extract_text(mime_type, payload)
+        else:
+            text = _CPU_POOL.submit(_extract_text, mime_type, payload).result()
 
         # log_function_result(self.logger, "_extract_text_from_response", f"Extracted {len(text)} characters")
         return text
@@ -291,20 +524,32 @@ class DocumentSummarizerTool(BaseTool):
             if is_url:
                 # Fetch document content from the URL
                 self.logger.info(f"Fetching content from URL: {query}")
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                }
-                response = requests.get(query, headers=headers, allow_redirects=True)
+                response = _HTTP_SESSION.get(query, allow_redirects=True, timeout=_FETCH_TIMEOUT_SECONDS)
                 response.raise_for_status()
                 
                 # Extract text based on document type
                 text = self._extract_text_from_response(response)
+
+                # A near-empty extraction means a scanned/image-only
+                # document; summarizing it would only hallucinate, so skip
+                # the LLM call entirely
+                if len(text.strip()) < 200:
+                    self.logger.warning(f"Extracted only {len(text.strip())} characters from {query}; skipping summarization")
+                    return {"error": "Document contains no extractable text (likely scanned or image-based)."}
             else:
                 text = query
             
-            # Summarize the extracted text
-            # self.logger.debug("Generating summary of extracted text")
-            summary = self.chain.invoke({"content": text}).content
+            # Summarize the extracted text, reusing the stored summary when
+            # this exact content has been summarized before — filings are
+            # immutable once published, so re-summarizing is pure waste
+            cache_key = summary_cache.content_key(text)
+            summary = summary_cache.get_summary(cache_key)
+            if summary is None:
+                # self.logger.debug("Generating summary of extracted text")
+                summary = self.chain.invoke({"content": self._map_if_needed(text)}).content
+                summary_cache.put_summary(cache_key, summary, source_url=query if is_url else "")
+            else:
+                self.logger.info("Summary cache hit")
             
             result = {
                 "type": "text",
@@ -312,9 +557,108 @@ class DocumentSummarizerTool(BaseTool):
                 "result": summary,
             }
             # log_function_result(self.logger, "_run", result)
-            self.logger.debug(f"Summarized content:\n\n{summary}")
+            self.logger.debug("Summarized content:\n\n%s", summary)
             return result
             
         except Exception as e:
             log_error(self.logger, e, "document summarization")
-            return {"error": f"Document summarization failed: {str(e)}"}
\ No newline at end of file
+            return {"error": f"Document summarization failed: {str(e)}"}
+
+    def stream_summary(self, text: str):
+        """Yield summary chunks as the model produces them.
+
+        Lets callers start rendering a long summary while the rest is
+        still decoding. Cached contents yield their stored summary as a
+        single chunk; fresh ones are written back to the cache once the
+        stream completes.
+        """
+        cache_key = summary_cache.content_key(text)
+        cached = summary_cache.get_summary(cache_key)
+        if cached is not None:
+            self.logger.info("Summary cache hit")
+            yield cached
+            return
+        parts = []
+        for chunk in self.chain.stream({"content": self._map_if_needed(text)}):
+            parts.append(chunk.content)
+            yield chunk.content
+        summary_cache.put_summary(cache_key, "".join(parts))
+
+    def _map_if_needed(self, text: str) -> str:
+        """Return content sized for a single summarizer call.
+
+        Documents over the token bound are split into token-aware chunks
+        whose summaries (cached per chunk content, fetched concurrently)
+        stand in for the raw text, making the caller's call the reduce
+        step of a map-reduce. Small documents pass through unchanged.
+        """
+        if len(_token_encoder().encode(text)) <= _SUMMARY_TOKEN_LIMIT:
+            return text
+        chunks = _chunk_splitter().split_text(text)
+        self.logger.info(f"Map-reduce summarization over {len(chunks)} chunks")
+        keys = [summary_cache.content_key(chunk) for chunk in chunks]
+        summaries = [summary_cache.get_summary(key) for key in keys]
+        pending = [i for i, summary in enumerate(summaries) if summary is None]
+        if pending:
+            responses = self.chain.batch(
+                [{"content": chunks[i]} for i in pending],
+                config={"max_concurrency": 5},
+            )
+            for i, response in zip(pending, responses):
+                summaries[i] = response.content
+                summary_cache.put_summary(keys[i], summaries[i])
+        return "\n\n".join(summaries)
+
+    @staticmethod
+    def _marshal_entries(texts: List[str]) -> Dict[str, Any]:
+        """Pack raw document texts into the batch-prompt variables."""
+        entries = "\n\n".join(f"[{i}] {text}" for i, text in enumerate(texts, start=1))
+        return {"count": len(texts), "entries": entries}
+
+    def _pending_after_cache(self, texts: List[str]) -> tuple:
+        """Resolve cached summaries and return what still needs the LLM."""
+        keys = [summary_cache.content_key(text) for text in texts]
+        summaries: List[Any] = [summary_cache.get_summary(key) for key in keys]
+        pending = [i for i, summary in enumerate(summaries) if summary is None]
+        return keys, summaries, pending
+
+    def _store_chunk(self, chunk: List[int], response: BatchSummarySchema,
+                     texts: List[str], keys: List[str], summaries: List[Any]) -> None:
+        """Apply one row-marshalled response positionally and cache it."""
+        for i, summary in zip(chunk, response.summaries[:len(chunk)]):
+            summaries[i] = summary
+            summary_cache.put_summary(keys[i], summary)
+
+    def batch_run(self, texts: List[str]) -> List[str]:
+        """Summarize several documents with one LLM call per chunk.
+
+        A K-document workload pays ceil(K / chunk size) round-trips instead
+        of K; cached contents are resolved without any call at all.
+        """
+        keys, summaries, pending = self._pending_after_cache(texts)
+        for start in range(0, len(pending), self._BATCH_SUMMARY_SIZE):
+            chunk = pending[start:start + self._BATCH_SUMMARY_SIZE]
+            self.logger.info(f"Summarizing {len(chunk)} documents in one call")
+            response = self.batch_chain.invoke(self._marshal_entries([texts[i] for i in chunk]))
+            self._store_chunk(chunk, response, texts, keys, summaries)
+        # A short response leaves its tail unsummarized; finish those
+        # individually rather than failing the whole batch
+        for i in (i for i, summary in enumerate(summaries) if summary is None):
+            summaries[i] = self.chain.invoke({"content": texts[i]}).content
+            summary_cache.put_summary(keys[i], summaries[i])
+        return summaries
+
+    async def batch_run_async(self, texts: List[str]) -> List[str]:
+        """Async batch_run: chunks are row-marshalled and issued in parallel."""
+        keys, summaries, pending = self._pending_after_cache(texts)
+        chunks = [pending[start:start + self._BATCH_SUMMARY_SIZE]
+                  for start in range(0, len(pending), self._BATCH_SUMMARY_SIZE)]
+        responses = await asyncio.gather(
+            *(self.batch_chain.ainvoke(self._marshal_entries([texts[i] for i in chunk])) for chunk in chunks)
+        )
+        for chunk, response in zip(chunks, responses):
+            self._store_chunk(chunk, response, texts, keys, summaries)
+        for i in (i for i, summary in enumerate(summaries) if summary is None):
+            summaries[i] = (await self.chain.ainvoke({"content": texts[i]})).content
+            summary_cache.put_summary(keys[i], summaries[i])
+        return summaries
\ No newline at end of file
@@ -0,0 +1,24 @@
+"""On-disk URL-keyed cache for crawl results."""
+
+from functools import lru_cache
+from typing import Any
+
+from diskcache import Cache
+
+# Crawled pages go stale quickly (news sites, filing indexes), so entries
+# are only reused for a few hours — long enough to cover the repeated
+# lookups within a session and across closely spaced queries.
+_TTL_SECONDS = 6 * 3600
+
+
+@lru_cache(maxsize=1)
+def _cache() -> Cache:
+    return Cache("./.crawl_cache", size_limit=2 * 2**30)
+
+
+def get_crawl(url: str) -> Any:
+    return _cache().get(url)
+
+
+def put_crawl(url: str, result: Any) -> None:
+    _cache().set(url, result, expire=_TTL_SECONDS)
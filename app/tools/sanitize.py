@@ -0,0 +1,73 @@
+"""Local, deterministic code sanitation for the Python REPL."""
+
+import ast
+import io
+import tokenize
+
+
+def sanitize(code: str) -> str:
+    """Rewrite a code snippet into clean, executable Python statements.
+
+    Round-tripping through ast.parse/ast.unparse drops comments, docstring
+    formatting noise and blank lines in about a millisecond, replacing the
+    LLM round-trip the sanitizer prompt used to spend on the same job.
+    Statements are newline-joined rather than ';'-joined because compound
+    statements (for/if/def) cannot legally share a line with a following
+    statement.
+
+    Raises:
+        SyntaxError: when the snippet cannot be parsed or tokenized, in
+            which case the caller may fall back to the LLM sanitizer.
+    """
+    if "\n" not in code and "#" in code:
+        recovered = _split_swallowed_statements(code)
+        if recovered is not None:
+            return recovered
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return _strip_comment_tokens(code)
+    return "\n".join(ast.unparse(node) for node in tree.body)
+
+
+def _split_swallowed_statements(code: str) -> str | None:
+    """Recover ';'-joined statements swallowed by a mid-line comment.
+
+    Model-emitted one-liners often interleave comments with statements
+    ("a; # note; b"). Lexically the '#' comments out everything to the end
+    of the line, so ast.parse succeeds and the trailing statements would be
+    silently dropped. Splitting on ';' and discarding the comment segments
+    recovers them. Returns None when the input has no real comment token
+    (e.g. '#' inside a string literal) or the rebuilt text does not parse
+    (e.g. ';' inside a string), in which case the caller takes the normal
+    round-trip path.
+    """
+    try:
+        has_comment = any(
+            tok.type == tokenize.COMMENT
+            for tok in tokenize.generate_tokens(io.StringIO(code).readline)
+        )
+    except (tokenize.TokenError, IndentationError):
+        return None
+    if not has_comment:
+        return None
+    segments = [seg.strip() for seg in code.split(";")]
+    rebuilt = "\n".join(seg for seg in segments if seg and not seg.startswith("#"))
+    try:
+        tree = ast.parse(rebuilt)
+    except SyntaxError:
+        return None
+    return "\n".join(ast.unparse(node) for node in tree.body)
+
+
+def _strip_comment_tokens(code: str) -> str:
+    """Comment/blank-line stripping for snippets ast.parse rejects."""
+    try:
+        tokens = [
+            tok for tok in tokenize.generate_tokens(io.StringIO(code).readline)
+            if tok.type != tokenize.COMMENT
+        ]
+        stripped = tokenize.untokenize(tokens)
+    except (tokenize.TokenError, IndentationError) as e:
+        raise SyntaxError(str(e)) from e
+    return "\n".join(line for line in stripped.splitlines() if line.strip())
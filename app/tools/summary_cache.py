@@ -0,0 +1,31 @@
+"""On-disk content-addressed cache for document summaries."""
+
+import hashlib
+from functools import lru_cache
+
+from diskcache import Cache
+
+# Non-final documents (news pages, draft reports) get a TTL; published
+# filings are immutable, so entries whose source URL points at SEC EDGAR
+# are kept permanently.
+_DEFAULT_TTL_SECONDS = 90 * 24 * 3600
+_IMMUTABLE_URL_MARKERS = ("sec.gov/Archives", "sec.gov/cgi-bin")
+
+
+@lru_cache(maxsize=1)
+def _cache() -> Cache:
+    return Cache("./.summary_cache", size_limit=10 * 2**30)
+
+
+def content_key(text: str) -> str:
+    """Content hash, so URL variants of the same document share one entry."""
+    return hashlib.sha256(text.encode("utf-8", errors="replace")).hexdigest()
+
+
+def get_summary(key: str) -> str | None:
+    return _cache().get(key)
+
+
+def put_summary(key: str, summary: str, source_url: str = "") -> None:
+    expire = None if any(m in source_url for m in _IMMUTABLE_URL_MARKERS) else _DEFAULT_TTL_SECONDS
+    _cache().set(key, summary, expire=expire)
@@ -1,10 +1,54 @@
 """Logging configuration module for FinAgent Pro."""
 
+import atexit
 import logging
+import logging.handlers
 import os
-from datetime import datetime
+import queue
+from functools import lru_cache
 from typing import Optional, Any
 
+# All loggers feed one queue; a single background listener owns the file
+# and console handlers, so emitting a record on a request thread is just a
+# queue put — the disk write, its lock, and the flush syscall happen off
+# the hot path.
+_LOG_QUEUE: "queue.Queue" = queue.Queue(-1)
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _ensure_listener(log_level: int, console_level: int) -> None:
+    """Start the shared listener that performs the actual log I/O."""
+    global _listener
+    if _listener is not None:
+        return
+
+    logs_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'logs')
+    os.makedirs(logs_dir, exist_ok=True)
+    log_file = os.path.join(logs_dir, 'finagent.log')
+
+    # Rotate at midnight instead of baking the date into the filename,
+    # so long-lived processes keep writing to the right day's log
+    file_handler = logging.handlers.TimedRotatingFileHandler(log_file, when='midnight')
+    file_handler.suffix = '%Y%m%d'
+    file_handler.setLevel(log_level)
+    file_handler.setFormatter(logging.Formatter(
+        '%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(funcName)s - %(message)s'
+    ))
+
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(console_level)
+    console_handler.setFormatter(logging.Formatter(
+        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    ))
+
+    _listener = logging.handlers.QueueListener(
+        _LOG_QUEUE, file_handler, console_handler, respect_handler_level=True
+    )
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+@lru_cache(maxsize=None)
 def setup_logger(
     name: str,
     log_level: int = logging.DEBUG,
@@ -12,50 +56,38 @@ def setup_logger(
     console_level: int = logging.INFO
 ) -> logging.Logger:
     """
-    Set up a logger with both file and console handlers.
-    
+    Set up a logger that hands records to the shared background listener.
+
     Args:
         name: The name of the logger (usually __name__ of the module)
         log_level: The logging level for the file handler
         log_to_file: Whether to log to a file
         console_level: The logging level for the console handler
-    
+
     Returns:
         A configured logger instance
     """
+    # Memoized via lru_cache: every tool instantiation asking for the same
+    # logger name gets the already-configured instance back without
+    # touching the handler machinery again
     logger = logging.getLogger(name)
+
+    # Already configured on a previous call — reuse it rather than tearing
+    # down and re-registering handlers
+    if logger.handlers:
+        return logger
+
     logger.setLevel(log_level)
-    
-    # Remove any existing handlers
-    logger.handlers = []
-    
+
     # Prevent propagation to the root logger
     logger.propagate = False
-    
-    # Create logs directory if logging to file
+
+    # The handler levels live on the shared listener's handlers; the first
+    # configured logger's levels decide them for the process
     if log_to_file:
-        logs_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'logs')
-        os.makedirs(logs_dir, exist_ok=True)
-        log_file = os.path.join(logs_dir, f'finagent_{datetime.now().strftime("%Y%m%d")}.log')
-        
-        # Create file handler
-        file_handler = logging.FileHandler(log_file)
-        file_handler.setLevel(log_level)
-        file_formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(funcName)s - %(message)s'
-        )
-        file_handler.setFormatter(file_formatter)
-        logger.addHandler(file_handler)
-    
-    # Create console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(console_level)
-    console_formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    console_handler.setFormatter(console_formatter)
-    logger.addHandler(console_handler)
-    
+        _ensure_listener(log_level, console_level)
+    logger.addHandler(logging.handlers.QueueHandler(_LOG_QUEUE))
+
     return logger
 
 def log_function_call(logger: logging.Logger, func_name: str, **kwargs):
@@ -67,7 +99,9 @@ def log_function_call(logger: logging.Logger, func_name: str, **kwargs):
         func_name: The name of the function being called
         **kwargs: The function arguments to log
     """
-    logger.debug(f"Calling {func_name} with args: {kwargs}")
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    logger.debug("Calling %s with args: %s", func_name, kwargs)
 
 def log_function_result(logger: logging.Logger, func_name: str, result: Any):
     """
@@ -78,7 +112,9 @@ def log_function_result(logger: logging.Logger, func_name: str, result: Any):
         func_name: The name of the function
         result: The result to log
     """
-    logger.debug(f"Result from {func_name}: {result}")
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    logger.debug("Result from %s: %s", func_name, result)
 
 def log_error(logger: logging.Logger, error: Exception, context: Optional[str] = None):
     """
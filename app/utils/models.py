@@ -0,0 +1,17 @@
+"""Central model-tier policy for FinAgent Pro.
+
+Structural tasks (decompose, label, reformat) run on the small tier;
+only user-facing synthesis and result review need the frontier model.
+Keeping the mapping in one place makes the cost/latency policy auditable
+and lets a single edit re-tier a component.
+"""
+
+MODEL_TIERS = {
+    "planner": "gpt-4o-mini",
+    "router": "gpt-4o-mini",
+    "sanitizer": "gpt-4o-mini",
+    "summarizer": "gpt-4o-mini",
+    "evaluator": "gpt-4o-mini",
+    "reviewer": "gpt-4o",
+    "synthesizer": "gpt-4o",
+}
@@ -0,0 +1,103 @@
+"""Rate limiting utilities for FinAgent Pro."""
+
+import asyncio
+import threading
+import time
+
+from langchain_core.rate_limiters import BaseRateLimiter
+
+def estimate_tokens(text: str, model: str = "gpt-4o") -> int:
+    """
+    Estimate the number of tokens in a piece of text.
+
+    Uses tiktoken when available, falling back to a characters/4 heuristic.
+
+    Args:
+        text: The text to estimate
+        model: The model whose tokenizer should be used
+
+    Returns:
+        The estimated token count
+    """
+    try:
+        import tiktoken
+        return len(tiktoken.encoding_for_model(model).encode(text))
+    except Exception:
+        return max(1, len(text) // 4)
+
+class TokenBucketRateLimiter(BaseRateLimiter):
+    """
+    Token-bucket rate limiter that tracks both requests and tokens per minute.
+
+    The stock InMemoryRateLimiter only bounds requests/sec, so large prompts
+    can exhaust the provider's token-per-minute (TPM) budget and trigger 429
+    storms before the request limit ever engages. This limiter maintains two
+    buckets — one for requests and one for tokens — refilled continuously,
+    and blocks until both have capacity.
+
+    It implements the BaseRateLimiter interface so it can be passed directly
+    as `rate_limiter=` to ChatOpenAI; in that mode each request is charged a
+    configurable average token estimate. Callers that know the prompt size
+    can charge an explicit amount via `acquire_tokens`.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = 600,
+        tokens_per_minute: float = 200_000,
+        tokens_per_request: int = 2_000,
+        check_every_n_seconds: float = 0.1,
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.tokens_per_request = tokens_per_request
+        self.check_every_n_seconds = check_every_n_seconds
+
+        self._lock = threading.Lock()
+        self._request_bucket = requests_per_minute
+        self._token_bucket = tokens_per_minute
+        self._last_refill = time.monotonic()
+
+    def _refill(self) -> None:
+        """Refill both buckets based on elapsed time. Caller must hold the lock."""
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._request_bucket = min(
+            self.requests_per_minute,
+            self._request_bucket + elapsed * self.requests_per_minute / 60.0
+        )
+        self._token_bucket = min(
+            self.tokens_per_minute,
+            self._token_bucket + elapsed * self.tokens_per_minute / 60.0
+        )
+
+    def _try_acquire(self, tokens: int) -> bool:
+        """Attempt to consume one request and the given tokens without blocking."""
+        with self._lock:
+            self._refill()
+            if self._request_bucket >= 1 and self._token_bucket >= tokens:
+                self._request_bucket -= 1
+                self._token_bucket -= tokens
+                return True
+            return False
+
+    def acquire_tokens(self, tokens: int, blocking: bool = True) -> bool:
+        """Consume one request plus an explicit token estimate from the budget."""
+        if not blocking:
+            return self._try_acquire(tokens)
+        while not self._try_acquire(tokens):
+            time.sleep(self.check_every_n_seconds)
+        return True
+
+    def acquire(self, *, blocking: bool = True) -> bool:
+        """BaseRateLimiter hook used by LangChain chat models."""
+        return self.acquire_tokens(self.tokens_per_request, blocking=blocking)
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        """Async counterpart of acquire."""
+        if not blocking:
+            return self._try_acquire(self.tokens_per_request)
+        while not self._try_acquire(self.tokens_per_request):
+            await asyncio.sleep(self.check_every_n_seconds)
+        return True
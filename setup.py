@@ -1,9 +1,24 @@
+import os
+
 from setuptools import setup, find_packages
 
+# Opt-in mypyc compilation for the pure-Python hot modules. The schema
+# modules can't be compiled — they depend on untyped LangChain code and
+# their validation already runs in pydantic-core's Rust — so only the
+# prompt-rendering helpers qualify. Enable with FINAGENT_MYPYC=1.
+ext_modules = []
+if os.environ.get("FINAGENT_MYPYC"):
+    from mypyc.build import mypycify
+
+    ext_modules = mypycify(["app/evaluator/prompts.py"])
+
 setup(
     name="finagent-pro",
     version="0.1.0",
     packages=find_packages(),
+    # Prompt bodies live as data files next to the prompt modules
+    package_data={"app.prompts": ["data/*.md"]},
+    ext_modules=ext_modules,
     install_requires=[
         "streamlit>=1.32.0",
         "langchain>=0.1.0",
@@ -18,13 +33,17 @@ setup(
         "redis>=5.0.1",
         "pydantic>=2.6.1",
         "requests>=2.31.0",
-        "beautifulsoup4>=4.12.0",
+        "selectolax>=0.3.21",
         "plotly>=5.18.0",
+        "kaleido>=0.2.1",
         "matplotlib>=3.8.0",
-        "PyPDF2>=3.0.1",
+        "pypdfium2>=4.30.0",
         "langchain-text-splitters>=0.1.0",
         "faiss-cpu>=1.11.0",
-        "langchain-tavily>=0.2.3"
+        "langchain-tavily>=0.2.3",
+        "orjson>=3.9.0",
+        "tiktoken>=0.7.0",
+        "diskcache>=5.6.0"
     ],
     python_requires=">=3.9",
 )